@@ -0,0 +1,172 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import timedelta, timezone
+from threading import Lock
+from flask import Response, current_app, request, stream_with_context
+from models import db, State, Venue, Artist, Show
+
+# iCalendar feeds of shows per venue, artist and state. Each feed is cached
+# per entity and dropped only when one of its shows (or a name embedded in
+# them) changes, so polling clients are answered from memory and, with a
+# matching If-None-Match, with an empty 304. A feed's body depends only on
+# its shows (DTSTAMP is the show's start time), so its ETag, a digest of the
+# body, is the same in every worker process. The cache is bounded by entry
+# count and by total size; a feed past FEEDS_STREAM_THRESHOLD is streamed
+# straight from the query, holding one batch at a time, and not cached.
+
+FEEDS = {
+    'venue': (Venue, Show.venue_id),
+    'artist': (Artist, Show.artist_id),
+    'state': (State, Venue.state_id),
+}
+
+# (kind, entity_id) -> (built_at, etag, body)
+_feeds = OrderedDict()
+_cached_chars = 0
+_lock = Lock()
+
+
+def escape(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def fold(line):
+    # RFC 5545 caps content lines at 75 octets; continuations start with a space.
+    chunks = []
+    limit = 75
+    while len(line.encode('utf-8')) > limit:
+        cut = limit
+        while len(line[:cut].encode('utf-8')) > limit:
+            cut -= 1
+        chunks.append(line[:cut])
+        line = line[cut:]
+        limit = 74
+    chunks.append(line)
+    return '\r\n '.join(chunks) + '\r\n'
+
+def format_utc(value):
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+def events_query(kind, entity_id):
+    column = FEEDS[kind][1]
+    return db.session.query(Show.venue_id, Show.artist_id, Show.start_time,
+            Artist.name, Venue.name, Venue.address, Venue.city, State.name)\
+        .join(Artist, Artist.id == Show.artist_id)\
+        .join(Venue, Venue.id == Show.venue_id)\
+        .join(State, State.id == Venue.state_id)\
+        .filter(column == entity_id).order_by(Show.start_time.asc())\
+        .yield_per(current_app.config['FEEDS_BATCH_SIZE'])
+
+def generate_feed(kind, entity_id, name):
+    batch_size = current_app.config['FEEDS_BATCH_SIZE']
+    duration = timedelta(minutes=current_app.config['FEEDS_SHOW_DURATION_MINUTES'])
+    batch = [
+        'BEGIN:VCALENDAR\r\n',
+        'VERSION:2.0\r\n',
+        'PRODID:-//Fyyur//Shows//EN\r\n',
+        'CALSCALE:GREGORIAN\r\n',
+        fold(f'X-WR-CALNAME:{escape(name)} shows'),
+    ]
+    for venue_id, artist_id, start_time, artist_name, venue_name, address, city, state in \
+            events_query(kind, entity_id):
+        start = format_utc(start_time)
+        batch.extend([
+            'BEGIN:VEVENT\r\n',
+            f'UID:{venue_id}-{artist_id}-{start}@fyyur\r\n',
+            f'DTSTAMP:{start}\r\n',
+            f'DTSTART:{start}\r\n',
+            f'DTEND:{format_utc(start_time + duration)}\r\n',
+            fold(f'SUMMARY:{escape(artist_name)} at {escape(venue_name)}'),
+            fold(f'LOCATION:{escape(venue_name)}\\, {escape(address)}\\, {escape(city)}\\, {escape(state)}'),
+            'END:VEVENT\r\n',
+        ])
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    batch.append('END:VCALENDAR\r\n')
+    yield ''.join(batch)
+
+def cached_feed(key):
+    with _lock:
+        entry = _feeds.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > current_app.config['FEEDS_MAX_AGE']:
+            evict(key)
+            return None
+        _feeds.move_to_end(key)
+        return entry
+
+def evict(key):
+    # Callers hold _lock.
+    global _cached_chars
+    entry = _feeds.pop(key, None)
+    if entry is not None:
+        _cached_chars -= len(entry[2])
+
+def store_feed(key, body):
+    global _cached_chars
+    etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+    config = current_app.config
+    with _lock:
+        evict(key)
+        _feeds[key] = (time.monotonic(), etag, body)
+        _cached_chars += len(body)
+        while len(_feeds) > config['FEEDS_CACHE_SIZE'] or _cached_chars > config['FEEDS_CACHE_CHARS']:
+            evict(next(iter(_feeds)))
+    return etag
+
+def invalidate(keys):
+    with _lock:
+        for key in keys:
+            evict(key)
+
+def related_feed_keys(kind, entity_id):
+    # Feeds that embed a venue or artist: its own, its state's (for venues),
+    # and those of every counterpart it has shows with.
+    if kind == 'venue':
+        rows = db.session.query(Show.artist_id, Venue.state_id).join(Venue)\
+            .filter(Show.venue_id == entity_id).distinct().all()
+        keys = {('venue', entity_id)} | {('artist', artist_id) for artist_id, _ in rows}
+        state_id = db.session.query(Venue.state_id).filter(Venue.id == entity_id).scalar()
+        return keys | {('state', state_id)}
+    rows = db.session.query(Show.venue_id, Venue.state_id).join(Venue)\
+        .filter(Show.artist_id == entity_id).distinct().all()
+    return {('artist', entity_id)} \
+        | {('venue', venue_id) for venue_id, _ in rows} \
+        | {('state', state_id) for _, state_id in rows}
+
+def show_feed_keys(venue_id, artist_id):
+    state_id = db.session.query(Venue.state_id).filter(Venue.id == venue_id).scalar()
+    return {('venue', int(venue_id)), ('artist', int(artist_id)), ('state', state_id)}
+
+def feed_response(kind, entity_id):
+    key = (kind, entity_id)
+    max_age = current_app.config['FEEDS_MAX_AGE']
+    entry = cached_feed(key)
+    if entry is None:
+        model = FEEDS[kind][0]
+        name = db.session.query(model.name).filter(model.id == entity_id).scalar()
+        if name is None:
+            return None
+        # Buffer the feed to answer with its ETag, up to the threshold; past
+        # it the rest is streamed through as it is built.
+        chunks = generate_feed(kind, entity_id, name)
+        buffered = []
+        size = 0
+        for chunk in chunks:
+            buffered.append(chunk)
+            size += len(chunk)
+            if size > current_app.config['FEEDS_STREAM_THRESHOLD']:
+                def stream(head):
+                    yield head
+                    yield from chunks
+                response = Response(stream_with_context(stream(''.join(buffered))), mimetype='text/calendar')
+                response.cache_control.max_age = max_age
+                return response
+        body = ''.join(buffered)
+        entry = (None, store_feed(key, body), body)
+    response = Response(entry[2], mimetype='text/calendar')
+    response.set_etag(entry[1])
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
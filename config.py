@@ -1,11 +1,92 @@
 import os
-SECRET_KEY = os.urandom(32)
+# Signs sessions and form CSRF tokens: set it when running more than one
+# worker, or each process rejects the tokens issued by the others.
+SECRET_KEY = os.environ.get('FYYUR_SECRET_KEY') or os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 # Enable debug mode.
 DEBUG = True
 
+# Blueprints registered by create_app(), in order.
+BLUEPRINTS = ['views.main', 'views.venues', 'views.artists', 'views.shows', 'views.reports', 'views.admin']
+
+# Set by the flask command line before the app is loaded; CLI-only
+# extensions (migrations, maintenance commands) are skipped otherwise.
+CLI = os.environ.get('FLASK_RUN_FROM_CLI') == 'true'
+
 # Connect to the database
 SQLALCHEMY_DATABASE_URI = 'postgres://lu@localhost:5432/fyyur'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Shows are range-partitioned by month (see partitions.py)
+SHOWS_PARTITIONS_AHEAD = 3
+SHOWS_RETENTION_MONTHS = 24
+SHOWS_ARCHIVE_TABLESPACE = None
+
+# iCalendar feeds (see calendars.py)
+FEEDS_CACHE_SIZE = 1024
+# Total characters of cached feed bodies, per process.
+FEEDS_CACHE_CHARS = 67108864
+FEEDS_MAX_AGE = 300
+FEEDS_BATCH_SIZE = 500
+FEEDS_SHOW_DURATION_MINUTES = 120
+# Feeds longer than this (in characters) are streamed as they are built,
+# without an ETag, and never cached.
+FEEDS_STREAM_THRESHOLD = 262144
+
+# Nearby venues search (see geo.py)
+GEO_GAZETTEER_PATH = os.path.join(basedir, 'data', 'gazetteer.csv')
+GEO_NEAREST_START_KM = 10
+GEO_MAX_RADIUS_KM = 500
+# /venues/nearby answers the GEO_NEAREST_DEFAULT_K nearest venues when no
+# radius or k is given, and never more than GEO_MAX_RESULTS.
+GEO_NEAREST_DEFAULT_K = 10
+GEO_MAX_RESULTS = 200
+
+# Background jobs (see jobs.py)
+JOBS_MODULES = ['geo', 'partitions']
+JOBS_WORKER_CONFIG = 'config'
+JOBS_PROCESSES = 4
+JOBS_POLL_INTERVAL = 1.0
+JOBS_MAX_ATTEMPTS = 5
+JOBS_BACKOFF_SECONDS = 10
+JOBS_BACKOFF_MAX_SECONDS = 3600
+JOBS_LOCK_TIMEOUT = 600
+
+# Artist and venue recommendations (see recommendations.py)
+RECOMMENDATIONS_K = 10
+RECOMMENDATIONS_GENRE_WEIGHT = 0.6
+RECOMMENDATIONS_TTL = 3600
+
+# Faceted /artists and /venues listings (see facets.py)
+FACETS_TTL = 300
+
+# Admission control (see ratelimit.py). Rates are tokens per second.
+RATELIMIT_ENABLED = True
+RATELIMIT_STORE = None
+# Number of reverse proxies in front of the app that append to
+# X-Forwarded-For; 0 keys clients by the connection's address.
+RATELIMIT_PROXY_HOPS = 0
+RATELIMIT_ROUTES = {
+    'venues.search_venues': 'search',
+    'artists.search_artists': 'search',
+    'venues.nearby_venues': 'search',
+}
+RATELIMIT_CLASSES = {
+    'search': {'rate': 1.0, 'burst': 10, 'concurrency': 4, 'queue_timeout': 0.5},
+    'write': {'rate': 0.5, 'burst': 10, 'concurrency': 8, 'queue_timeout': 2.0},
+}
+
+# Token expected in the X-Admin-Token header by /admin endpoints; they are
+# disabled while unset.
+ADMIN_TOKEN = os.environ.get('FYYUR_ADMIN_TOKEN')
+
+# Sampling profiler (see profiler.py). Admins can also profile a single
+# request by sending `X-Profile: 1` with their X-Admin-Token.
+PROFILER_ENABLED = False
+PROFILER_SAMPLE_RATE = 0.01
+PROFILER_INTERVAL = 0.005
+PROFILER_MAX_OVERHEAD = 0.02
+PROFILER_MAX_SAMPLES = 2000
+PROFILER_MAX_STACKS = 5000
@@ -0,0 +1,233 @@
+import time
+from collections import defaultdict
+from threading import Lock
+from flask import current_app, url_for
+from models import db, Genre, State, Venue, Artist, artist_genres_table, venue_genres_table
+
+# Faceted browsing for /artists and /venues. For every facet value (each
+# genre, each state, seeking yes/no) the index holds a bitmap of the ids
+# having it, as a Python int with bit `id` set. A filtered listing is the
+# AND of the selected facets (OR within one facet), and each option's count
+# is a popcount against the other facets' selection, so pages never run
+# COUNT queries. The create/edit/delete handlers keep the index current;
+# it is per process and rebuilt every FACETS_TTL seconds. A rebuild runs
+# outside the lock, each bitmap set once from its ids, and the handlers'
+# changes made meanwhile are replayed onto it before it is swapped in.
+
+FACETS = ('genre', 'state', 'seeking')
+LABELS = {'genre': 'Genre', 'state': 'State', 'seeking': 'Seeking'}
+
+_indexes = {}
+_rebuilding = {}
+_lock = Lock()
+
+
+# Positions of the set bits of every byte value.
+BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+
+def popcount(bitmap):
+    return bin(bitmap).count('1')
+
+def bitmap_of(ids):
+    # Sets each bit in a bytearray and converts once; OR-ing bits into an
+    # int one by one copies the whole int each time.
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for entity_id in ids:
+        data[entity_id >> 3] |= 1 << (entity_id & 7)
+    return int.from_bytes(data, 'little')
+
+def members(bitmap):
+    # Ids of the set bits, in one pass over the bitmap's bytes; testing
+    # `bitmap >> id & 1` per row would copy the bitmap for every row.
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    return {offset * 8 + bit for offset, byte in enumerate(data) if byte for bit in BYTE_BITS[byte]}
+
+
+class FacetIndex:
+    def __init__(self, entities, genre_names, state_names, seeking_label):
+        self.built_at = time.monotonic()
+        self.names = {
+            'genre': genre_names,
+            'state': state_names,
+            'seeking': {True: seeking_label, False: 'Not ' + seeking_label.lower()},
+        }
+        # entity id -> (genre ids, state id, seeking), as last indexed
+        self.entities = {entity_id: (frozenset(genre_ids), state_id, bool(seeking))
+                         for entity_id, (genre_ids, state_id, seeking) in entities.items()}
+        ids = {facet: defaultdict(list) for facet in FACETS}
+        for entity_id, (genre_ids, state_id, seeking) in self.entities.items():
+            for genre_id in genre_ids:
+                ids['genre'][genre_id].append(entity_id)
+            ids['state'][state_id].append(entity_id)
+            ids['seeking'][seeking].append(entity_id)
+        self.bitmaps = {facet: defaultdict(int, {value: bitmap_of(value_ids)
+                                                 for value, value_ids in ids[facet].items()})
+                        for facet in FACETS}
+        self.all = bitmap_of(list(self.entities))
+
+    def facet_keys(self, entity_id):
+        # (facet, value) of every bitmap the entity is in.
+        genre_ids, state_id, seeking = self.entities[entity_id]
+        return [('genre', genre_id) for genre_id in genre_ids] + [('state', state_id), ('seeking', seeking)]
+
+    def add(self, entity_id, genre_ids, state_id, seeking):
+        if entity_id in self.entities:
+            self.remove(entity_id)
+        self.entities[entity_id] = (frozenset(genre_ids), state_id, bool(seeking))
+        bit = 1 << entity_id
+        for facet, value in self.facet_keys(entity_id):
+            self.bitmaps[facet][value] |= bit
+        self.all |= bit
+
+    def remove(self, entity_id):
+        if entity_id not in self.entities:
+            return
+        bit = ~(1 << entity_id)
+        for facet, value in self.facet_keys(entity_id):
+            self.bitmaps[facet][value] &= bit
+        self.all &= bit
+        del self.entities[entity_id]
+
+    def select(self, filters, skip=None):
+        selection = self.all
+        for facet in FACETS:
+            if facet == skip or not filters.get(facet):
+                continue
+            matching = 0
+            for value in filters[facet]:
+                matching |= self.bitmaps[facet].get(value, 0)
+            selection &= matching
+        return selection
+
+    def counts(self, filters):
+        counts = {}
+        for facet in FACETS:
+            base = self.select(filters, skip=facet)
+            counts[facet] = {value: popcount(bitmap & base)
+                             for value, bitmap in self.bitmaps[facet].items()}
+        return counts
+
+
+def load_entities(model, table, key, seeking_column):
+    entities = {entity_id: (set(), state_id, seeking) for entity_id, state_id, seeking in
+                db.session.query(model.id, model.state_id, seeking_column)}
+    for entity_id, genre_id in db.session.query(table.c[key], table.c.genre_id):
+        if entity_id in entities:
+            entities[entity_id][0].add(genre_id)
+    return entities
+
+def build(kind):
+    genre_names = dict(db.session.query(Genre.id, Genre.name))
+    state_names = dict(db.session.query(State.id, State.name))
+    if kind == 'artist':
+        entities = load_entities(Artist, artist_genres_table, 'artist_id', Artist.seeking_venue)
+        return FacetIndex(entities, genre_names, state_names, 'Seeking venue')
+    entities = load_entities(Venue, venue_genres_table, 'venue_id', Venue.seeking_talent)
+    return FacetIndex(entities, genre_names, state_names, 'Seeking talent')
+
+def index(kind):
+    # A stale index keeps serving while one request rebuilds it; before the
+    # first build completes, concurrent requests each read their own.
+    with _lock:
+        current = _indexes.get(kind)
+        fresh = current is not None and time.monotonic() - current.built_at <= current_app.config['FACETS_TTL']
+        if fresh or (current is not None and kind in _rebuilding):
+            return current
+        building = kind in _rebuilding
+        if not building:
+            _rebuilding[kind] = []
+    if building:
+        return build(kind)
+    try:
+        rebuilt = build(kind)
+        with _lock:
+            for change in _rebuilding[kind]:
+                change(rebuilt)
+            _indexes[kind] = rebuilt
+        return rebuilt
+    finally:
+        with _lock:
+            _rebuilding.pop(kind, None)
+
+def parse_filters(args):
+    return {
+        'genre': args.getlist('genre', type=int),
+        'state': args.getlist('state', type=int),
+        'seeking': [value == 'y' for value in args.getlist('seeking') if value in ('y', 'n')],
+    }
+
+def selection(kind, filters):
+    # Set of the matching ids, or None when nothing is filtered.
+    if not any(filters.values()):
+        return None
+    current = index(kind)
+    with _lock:
+        bitmap = current.select(filters)
+    return members(bitmap)
+
+def options(kind, filters, endpoint):
+    # Facet options for the listing sidebar: label, live count, whether it
+    # is selected, and the URL toggling it.
+    current = index(kind)
+    with _lock:
+        counts = current.counts(filters)
+    query = {facet: [encode(facet, value) for value in values] for facet, values in filters.items()}
+    view_model = []
+    for facet in FACETS:
+        entries = []
+        names = current.names[facet]
+        for value, count in sorted(counts[facet].items(), key=lambda item: str(names.get(item[0], item[0]))):
+            selected = value in filters[facet]
+            if not count and not selected:
+                continue
+            toggled = dict(query)
+            code = encode(facet, value)
+            toggled[facet] = [v for v in query[facet] if v != code] if selected else query[facet] + [code]
+            entries.append({
+                'label': names.get(value, value),
+                'count': count,
+                'selected': selected,
+                'url': url_for(endpoint, **toggled)
+            })
+        view_model.append({'name': LABELS[facet], 'options': entries})
+    return view_model
+
+def encode(facet, value):
+    if facet == 'seeking':
+        return 'y' if value else 'n'
+    return value
+
+#  Hooks for the create/edit/delete handlers; no-ops until the index is built.
+#  ----------------------------------------------------------------
+
+def apply(kind, change):
+    # Applies to the live index and to one being rebuilt, which may have
+    # read the tables before this change was committed.
+    with _lock:
+        current = _indexes.get(kind)
+        if current is not None:
+            change(current)
+        if kind in _rebuilding:
+            _rebuilding[kind].append(change)
+
+def entity_changed(kind, entity_id, genre_ids, state_id, seeking):
+    genre_ids = [int(genre_id) for genre_id in genre_ids]
+    apply(kind, lambda current: current.add(int(entity_id), genre_ids, int(state_id), seeking))
+
+def entity_removed(kind, entity_id):
+    apply(kind, lambda current: current.remove(int(entity_id)))
+
+def artist_changed(artist_id, genre_ids, state_id, seeking_venue):
+    entity_changed('artist', artist_id, genre_ids, state_id, seeking_venue)
+
+def venue_changed(venue_id, genre_ids, state_id, seeking_talent):
+    entity_changed('venue', venue_id, genre_ids, state_id, seeking_talent)
+
+def artist_removed(artist_id):
+    entity_removed('artist', artist_id)
+
+def venue_removed(venue_id):
+    entity_removed('venue', venue_id)
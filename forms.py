@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_wtf import Form
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms.validators import DataRequired, AnyOf, URL, Optional
 from wtforms.ext.sqlalchemy.fields import QuerySelectField, QuerySelectMultipleField
 
 class ShowForm(Form):
@@ -44,10 +44,10 @@ class VenueForm(Form):
         validators=[DataRequired()]
     )
     facebook_link = StringField(
-        'facebook_link', validators=[URL()]
+        'facebook_link', validators=[Optional(), URL()]
     )
     website = StringField(
-        'website', validators=[URL()]
+        'website', validators=[Optional(), URL()]
     )
     seeking_talent = BooleanField(
         'seeking_talent'
@@ -80,10 +80,10 @@ class ArtistForm(Form):
         validators=[DataRequired()]
     )
     facebook_link = StringField(
-        'facebook_link', validators=[URL()]
+        'facebook_link', validators=[Optional(), URL()]
     )
     website = StringField(
-        'website', validators=[URL()]
+        'website', validators=[Optional(), URL()]
     )
     seeking_venue = BooleanField(
         'seeking_venue'
@@ -92,8 +92,12 @@ class ArtistForm(Form):
         'seeking_description'
     )
     available_from = DateTimeField(
-        'available_from'
+        'available_from',
+        format='%H:%M',
+        validators=[Optional()]
     )
     available_to = DateTimeField(
-        'available_to'
+        'available_to',
+        format='%H:%M',
+        validators=[Optional()]
     )
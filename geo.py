@@ -0,0 +1,195 @@
+import csv
+import math
+import os
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, State, Venue, venue_genres_table
+from jobs import job
+
+# Venues are bucketed into a fixed latitude/longitude grid; `geocell` is the
+# bucket number and is indexed, so a radius query only reads the venues of
+# the cells overlapping the search circle. Cells are numbered row by row, so
+# the cells of one grid row are a contiguous range and a circle of any size
+# is one `geocell BETWEEN` index range per row it spans. Changing
+# CELL_DEGREES requires `flask geo reindex`.
+CELL_DEGREES = 0.25
+CELL_COLUMNS = int(360 / CELL_DEGREES)
+CELL_ROWS = int(180 / CELL_DEGREES)
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+geo_cli = AppGroup('geo', help='Venue coordinates and spatial index.')
+
+_gazetteer = None
+
+
+def cell_row(latitude):
+    return min(int((latitude + 90) // CELL_DEGREES), CELL_ROWS - 1)
+
+def cell_col(longitude):
+    return int((longitude + 180) // CELL_DEGREES) % CELL_COLUMNS
+
+def cell_for(latitude, longitude):
+    return cell_row(latitude) * CELL_COLUMNS + cell_col(longitude)
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 \
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(latitude, longitude, radius_km):
+    lat_delta = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(latitude))
+    lng_delta = 180.0 if cos_lat < 1e-6 else min(180.0, radius_km / (KM_PER_DEGREE * cos_lat))
+    return (max(-90.0, latitude - lat_delta), min(90.0, latitude + lat_delta),
+            longitude - lng_delta, longitude + lng_delta)
+
+def cell_ranges(latitude, longitude, radius_km):
+    # Inclusive (first, last) geocell ranges covering the circle's bounding
+    # box: one per grid row, two where a row wraps the antimeridian, and
+    # adjacent ranges merged.
+    south, north, west, east = bounding_box(latitude, longitude, radius_km)
+    columns = int((east - west) // CELL_DEGREES) + 2
+    if columns >= CELL_COLUMNS:
+        spans = [(0, CELL_COLUMNS - 1)]
+    else:
+        first = cell_col(west)
+        last = first + columns - 1
+        spans = [(first, last)] if last < CELL_COLUMNS else [(0, last - CELL_COLUMNS), (first, CELL_COLUMNS - 1)]
+    ranges = []
+    for row in range(cell_row(south), cell_row(north) + 1):
+        for first, last in spans:
+            first, last = row * CELL_COLUMNS + first, row * CELL_COLUMNS + last
+            if ranges and ranges[-1][1] + 1 == first:
+                ranges[-1] = (ranges[-1][0], last)
+            else:
+                ranges.append((first, last))
+    return ranges
+
+def candidates_query(latitude, longitude, radius_km, genre_id=None, seeking_talent=None):
+    query = db.session.query(Venue.id, Venue.name, Venue.city, State.name,
+            Venue.latitude, Venue.longitude, Venue.seeking_talent)\
+        .join(State).filter(Venue.latitude.isnot(None))
+    query = query.filter(db.or_(*[Venue.geocell.between(first, last)
+                                  for first, last in cell_ranges(latitude, longitude, radius_km)]))
+    if genre_id is not None:
+        query = query.join(venue_genres_table)\
+            .filter(venue_genres_table.c.genre_id == genre_id)
+    if seeking_talent is not None:
+        query = query.filter(Venue.seeking_talent == seeking_talent)
+    return query
+
+def nearby_venues(latitude, longitude, radius_km=None, limit=None, genre_id=None, seeking_talent=None):
+    # With a radius: every venue inside it, nearest first. Without one: the
+    # `limit` nearest, growing the search circle until enough are found.
+    max_radius = current_app.config['GEO_MAX_RADIUS_KM']
+    if radius_km is None:
+        radius = min(current_app.config['GEO_NEAREST_START_KM'], max_radius)
+    else:
+        radius = min(radius_km, max_radius)
+    while True:
+        results = []
+        for venue_id, name, city, state, lat, lng, seeking in \
+                candidates_query(latitude, longitude, radius, genre_id, seeking_talent):
+            distance = haversine_km(latitude, longitude, lat, lng)
+            if distance <= radius:
+                results.append({
+                    'id': venue_id,
+                    'name': name,
+                    'city': city,
+                    'state': state,
+                    'seeking_talent': seeking,
+                    'distance_km': round(distance, 2)
+                })
+        results.sort(key=lambda venue: venue['distance_km'])
+        if radius_km is not None or (limit and len(results) >= limit) or radius >= max_radius:
+            return results[:limit] if limit else results
+        radius = min(radius * 2, max_radius)
+
+#  Gazetteer
+#  ----------------------------------------------------------------
+
+def load_gazetteer(path):
+    # Local CSV with city, state, latitude, longitude columns; venues are
+    # placed at the centroid of their city.
+    places = {}
+    with open(path, newline='', encoding='utf-8') as gazetteer:
+        for row in csv.DictReader(gazetteer):
+            key = (row['city'].strip().lower(), row['state'].strip().upper())
+            places[key] = (float(row['latitude']), float(row['longitude']))
+    return places
+
+def gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        path = current_app.config['GEO_GAZETTEER_PATH']
+        _gazetteer = load_gazetteer(path) if path and os.path.exists(path) else {}
+    return _gazetteer
+
+def locate(city, state_name, places=None):
+    places = gazetteer() if places is None else places
+    return places.get(((city or '').strip().lower(), (state_name or '').strip().upper()))
+
+def coordinates(latitude, longitude):
+    if latitude is None:
+        return {'latitude': None, 'longitude': None, 'geocell': None}
+    return {'latitude': latitude, 'longitude': longitude, 'geocell': cell_for(latitude, longitude)}
+
+def geocode_venue(venue, state):
+    point = locate(venue.city, state.name)
+    values = coordinates(*point) if point else coordinates(None, None)
+    venue.latitude, venue.longitude, venue.geocell = values['latitude'], values['longitude'], values['geocell']
+
+@job('geo.geocode_venue')
+def geocode_venue_job(venue_id):
+    venue = Venue.query.get(venue_id)
+    if venue is not None:
+        geocode_venue(venue, venue.state)
+
+def update_coordinates(rows):
+    db.session.execute(Venue.__table__.update()
+        .where(Venue.__table__.c.id == db.bindparam('venue_id'))
+        .values(latitude=db.bindparam('new_latitude'), longitude=db.bindparam('new_longitude'),
+                geocell=db.bindparam('new_geocell')), [{
+            'venue_id': row['venue_id'],
+            'new_latitude': row['latitude'],
+            'new_longitude': row['longitude'],
+            'new_geocell': row['geocell']
+        } for row in rows])
+
+
+@geo_cli.command('import-gazetteer')
+@click.argument('path', required=False)
+@click.option('--batch-size', default=5000, help='Venues updated per statement batch.')
+def import_gazetteer_command(path, batch_size):
+    """Set venue coordinates from a local gazetteer CSV file."""
+    places = load_gazetteer(path or current_app.config['GEO_GAZETTEER_PATH'])
+    located = missing = 0
+    batch = []
+    venues = db.session.query(Venue.id, Venue.city, State.name).join(State).yield_per(batch_size)
+    for venue_id, city, state in venues:
+        point = locate(city, state, places)
+        if point:
+            located += 1
+            batch.append(dict(coordinates(*point), venue_id=venue_id))
+        else:
+            missing += 1
+        if len(batch) >= batch_size:
+            update_coordinates(batch)
+            batch = []
+    if batch:
+        update_coordinates(batch)
+    db.session.commit()
+    click.echo(f'located {located} venues, {missing} not found in the gazetteer')
+
+@geo_cli.command('reindex')
+def reindex_command():
+    """Recompute the grid cell of every located venue."""
+    rows = [dict(coordinates(lat, lng), venue_id=venue_id) for venue_id, lat, lng in
+            db.session.query(Venue.id, Venue.latitude, Venue.longitude).filter(Venue.latitude.isnot(None))]
+    if rows:
+        update_coordinates(rows)
+    db.session.commit()
+    click.echo(f'reindexed {len(rows)} venues')
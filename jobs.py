@@ -0,0 +1,207 @@
+import json
+import random
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from importlib import import_module
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, Job
+
+# A small DB-backed job queue. Request handlers enqueue() follow-up work in
+# their own transaction, so a job exists only if the change that asked for
+# it was committed. `flask jobs work` claims due jobs with
+# SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers can share the
+# table, and runs them in a process pool.
+#
+# Each claim stamps its jobs with a fresh `locked_by` token, and the worker
+# refreshes `locked_at` of the jobs it is still running. Only jobs whose
+# heartbeat stopped for JOBS_LOCK_TIMEOUT (their worker died) are handed
+# out again, and a worker only finishes jobs still carrying its token.
+#
+# Job functions are registered with @job('name') in the modules listed in
+# JOBS_MODULES; passing `every` also makes the job periodic.
+
+jobs_cli = AppGroup('jobs', help='Deferred and periodic background jobs.')
+
+registry = {}
+schedules = {}
+
+
+def job(name, every=None):
+    def register(function):
+        registry[name] = function
+        if every is not None:
+            schedules[name] = every
+        return function
+    return register
+
+def enqueue(name, delay=None, max_attempts=None, **args):
+    # Added to the caller's session: committed (or rolled back) with it.
+    queued = Job(name=name, args=args, status='pending', attempts=0,
+                 max_attempts=max_attempts or current_app.config['JOBS_MAX_ATTEMPTS'])
+    if delay is not None:
+        queued.run_at = datetime.now().astimezone() + delay
+    db.session.add(queued)
+    return queued
+
+def import_job_modules(app):
+    for name in app.config['JOBS_MODULES']:
+        import_module(name)
+
+def claim(limit):
+    jobs = Job.__table__
+    due = db.select([jobs.c.id])\
+        .where(db.and_(jobs.c.status == 'pending', jobs.c.run_at <= db.func.now()))\
+        .order_by(jobs.c.run_at).limit(limit)\
+        .with_for_update(skip_locked=True)
+    claimed = db.session.execute(jobs.update()
+        .where(jobs.c.id.in_(due))
+        .values(status='running', locked_at=db.func.now(), locked_by=uuid.uuid4().hex,
+                attempts=jobs.c.attempts + 1)
+        .returning(jobs.c.id, jobs.c.name, jobs.c.args, jobs.c.attempts, jobs.c.max_attempts,
+                   jobs.c.locked_by)).fetchall()
+    db.session.commit()
+    return claimed
+
+def heartbeat(claimed_jobs):
+    locks = [(claimed.id, claimed.locked_by) for claimed in claimed_jobs]
+    if locks:
+        Job.query.filter(db.tuple_(Job.id, Job.locked_by).in_(locks), Job.status == 'running')\
+            .update({'locked_at': db.func.now()}, synchronize_session=False)
+        db.session.commit()
+
+def release_stale():
+    # Jobs left running by a worker that died are handed out again.
+    timeout = timedelta(seconds=current_app.config['JOBS_LOCK_TIMEOUT'])
+    Job.query.filter(Job.status == 'running', Job.locked_at < datetime.now().astimezone() - timeout)\
+        .update({'status': 'pending', 'locked_at': None, 'locked_by': None}, synchronize_session=False)
+    db.session.commit()
+
+def backoff(attempts):
+    base = current_app.config['JOBS_BACKOFF_SECONDS']
+    delay = min(base * 2 ** (attempts - 1), current_app.config['JOBS_BACKOFF_MAX_SECONDS'])
+    return timedelta(seconds=delay * random.uniform(1.0, 1.1))
+
+def finish(claimed, error):
+    # A job released as stale and claimed again belongs to its new runner.
+    now = datetime.now().astimezone()
+    query = Job.query.filter(Job.id == claimed.id, Job.locked_by == claimed.locked_by, Job.status == 'running')
+    if claimed.name in schedules and (error is None or claimed.attempts >= claimed.max_attempts):
+        # Periodic jobs keep a single row that is pushed to the next run.
+        query.update({'status': 'pending', 'attempts': 0, 'locked_at': None, 'locked_by': None,
+                      'last_error': error, 'run_at': now + schedules[claimed.name]}, synchronize_session=False)
+    elif error is None:
+        query.delete(synchronize_session=False)
+    elif claimed.attempts < claimed.max_attempts:
+        query.update({'status': 'pending', 'locked_at': None, 'locked_by': None, 'last_error': error,
+                      'run_at': now + backoff(claimed.attempts)}, synchronize_session=False)
+    else:
+        query.update({'status': 'failed', 'locked_at': None, 'locked_by': None, 'last_error': error},
+                     synchronize_session=False)
+    db.session.commit()
+
+def schedule_periodic():
+    for name in schedules:
+        # Serialise workers starting at the same time on this name.
+        db.session.execute(db.text('SELECT pg_advisory_xact_lock(hashtext(:name))'), {'name': name})
+        exists = db.session.query(Job.id).filter(Job.name == name, Job.status.in_(['pending', 'running']))\
+            .first()
+        if exists is None:
+            enqueue(name)
+        db.session.commit()
+
+#  Worker processes
+#  ----------------------------------------------------------------
+
+_worker_app = None
+
+def init_worker(config):
+    global _worker_app
+    from app import create_app
+    _worker_app = create_app(config)
+    _worker_app.app_context().push()
+    import_job_modules(_worker_app)
+
+def execute(name, args):
+    try:
+        registry[name](**args)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        return traceback.format_exc()
+    finally:
+        db.session.remove()
+    return None
+
+def start_pool(app, processes):
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+    return ProcessPoolExecutor(processes, mp_context=get_context('spawn'), initializer=init_worker,
+                               initargs=(app.config['JOBS_WORKER_CONFIG'],))
+
+def work(processes, poll_interval, burst=False):
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from concurrent.futures.process import BrokenProcessPool
+    app = current_app._get_current_object()
+    import_job_modules(app)
+    schedule_periodic()
+    pool = start_pool(app, processes)
+    running = {}
+    last_heartbeat = 0
+    try:
+        while True:
+            if time.monotonic() - last_heartbeat > app.config['JOBS_LOCK_TIMEOUT'] / 4:
+                heartbeat(running.values())
+                release_stale()
+                last_heartbeat = time.monotonic()
+            if len(running) < processes:
+                for claimed in claim(processes - len(running)):
+                    if claimed.name not in registry:
+                        finish(claimed, f'unknown job {claimed.name!r}')
+                        continue
+                    try:
+                        future = pool.submit(execute, claimed.name, claimed.args)
+                    except BrokenProcessPool:
+                        # A child died: the jobs it took down fail with
+                        # BrokenProcessPool below; carry on with a new pool.
+                        pool.shutdown(wait=False)
+                        pool = start_pool(app, processes)
+                        future = pool.submit(execute, claimed.name, claimed.args)
+                    running[future] = claimed
+            if not running:
+                if burst:
+                    return
+                time.sleep(poll_interval)
+                continue
+            done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                claimed = running.pop(future)
+                try:
+                    error = future.result()
+                except Exception:
+                    error = traceback.format_exc()
+                finish(claimed, error)
+    finally:
+        pool.shutdown()
+
+
+@jobs_cli.command('work')
+@click.option('--processes', default=None, type=int, help='Size of the process pool.')
+@click.option('--poll', default=None, type=float, help='Seconds between polls of an idle queue.')
+@click.option('--burst', is_flag=True, help='Exit once no job is due.')
+def work_command(processes, poll, burst):
+    """Run queued jobs until interrupted."""
+    work(processes or current_app.config['JOBS_PROCESSES'],
+         poll or current_app.config['JOBS_POLL_INTERVAL'], burst)
+
+@jobs_cli.command('enqueue')
+@click.argument('name')
+@click.argument('args', default='{}')
+def enqueue_command(name, args):
+    """Queue job NAME with ARGS given as a JSON object."""
+    queued = enqueue(name, **json.loads(args))
+    db.session.commit()
+    click.echo(f'queued {name} as job {queued.id}')
@@ -0,0 +1,30 @@
+"""Venue coordinates and grid cell
+
+Revision ID: 3b9e5a7f2c14
+Revises: 8d3f0c6b1e27
+Create Date: 2026-10-19 11:03:57.842110
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e5a7f2c14'
+down_revision = '8d3f0c6b1e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('venues', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('venues', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('venues', sa.Column('geocell', sa.Integer(), nullable=True))
+    op.create_index('ix_venues_geocell', 'venues', ['geocell'])
+
+
+def downgrade():
+    op.drop_index('ix_venues_geocell', table_name='venues')
+    op.drop_column('venues', 'geocell')
+    op.drop_column('venues', 'longitude')
+    op.drop_column('venues', 'latitude')
@@ -0,0 +1,41 @@
+"""Booking rollups
+
+Revision ID: 5e8b2f6a1d93
+Revises: c41a7e2d9f05
+Create Date: 2026-10-19 16:48:30.912764
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b2f6a1d93'
+down_revision = 'c41a7e2d9f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('booking_rollups',
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.Column('state_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('show_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ),
+        sa.ForeignKeyConstraint(['state_id'], ['states.id'], ),
+        sa.PrimaryKeyConstraint('genre_id', 'state_id', 'month')
+    )
+
+    op.create_table('venue_utilization',
+        sa.Column('venue_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('show_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('venue_id', 'month')
+    )
+
+
+def downgrade():
+    op.drop_table('venue_utilization')
+    op.drop_table('booking_rollups')
@@ -0,0 +1,85 @@
+"""Partition shows by month
+
+Revision ID: 8d3f0c6b1e27
+Revises: 52421aa80a74
+Create Date: 2026-10-19 09:12:40.318204
+
+"""
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f0c6b1e27'
+down_revision = '52421aa80a74'
+branch_labels = None
+depends_on = None
+
+# Months of empty partitions created ahead of the current one. The
+# `flask partitions maintain` command keeps this horizon moving afterwards.
+MONTHS_AHEAD = 3
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def upgrade():
+    op.execute('ALTER TABLE shows RENAME TO shows_unpartitioned')
+    op.execute('ALTER TABLE shows_unpartitioned RENAME CONSTRAINT shows_pkey TO shows_unpartitioned_pkey')
+
+    op.execute("""
+        CREATE TABLE shows (
+            venue_id INTEGER NOT NULL REFERENCES venues (id),
+            artist_id INTEGER NOT NULL REFERENCES artists (id),
+            start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+            CONSTRAINT shows_pkey PRIMARY KEY (venue_id, artist_id, start_time)
+        ) PARTITION BY RANGE (start_time)
+    """)
+    op.execute('CREATE TABLE shows_default PARTITION OF shows DEFAULT')
+
+    conn = op.get_bind()
+    current = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    oldest = conn.execute(sa.text('SELECT min(start_time) FROM shows_unpartitioned')).scalar()
+    month = current
+    if oldest is not None:
+        oldest = oldest.astimezone(timezone.utc)
+        month = min(current, current.replace(year=oldest.year, month=oldest.month))
+    while month <= _add_months(current, MONTHS_AHEAD):
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE shows_y{month:%Y}m{month:%m} PARTITION OF shows "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+    op.execute('INSERT INTO shows (venue_id, artist_id, start_time) '
+               'SELECT venue_id, artist_id, start_time FROM shows_unpartitioned')
+    op.execute('DROP TABLE shows_unpartitioned')
+
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'])
+    op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'])
+    op.execute('CREATE SCHEMA IF NOT EXISTS shows_archive')
+
+
+def downgrade():
+    # Archived partitions live in the shows_archive schema and are left in
+    # place; attach them back first if their rows should survive the downgrade.
+    op.execute('ALTER TABLE shows RENAME TO shows_partitioned')
+    op.execute('ALTER TABLE shows_partitioned RENAME CONSTRAINT shows_pkey TO shows_partitioned_pkey')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows_partitioned')
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows_partitioned')
+
+    op.create_table('shows',
+        sa.Column('venue_id', sa.Integer(), nullable=False),
+        sa.Column('artist_id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['artist_id'], ['artists.id'], ),
+        sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ),
+        sa.PrimaryKeyConstraint('venue_id', 'artist_id', 'start_time')
+    )
+    op.execute('INSERT INTO shows (venue_id, artist_id, start_time) '
+               'SELECT venue_id, artist_id, start_time FROM shows_partitioned')
+    op.execute('DROP TABLE shows_partitioned CASCADE')
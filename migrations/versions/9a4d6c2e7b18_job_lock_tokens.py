@@ -0,0 +1,24 @@
+"""Job lock tokens
+
+Revision ID: 9a4d6c2e7b18
+Revises: 5e8b2f6a1d93
+Create Date: 2026-10-20 10:04:37.281950
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4d6c2e7b18'
+down_revision = '5e8b2f6a1d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('jobs', sa.Column('locked_by', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    op.drop_column('jobs', 'locked_by')
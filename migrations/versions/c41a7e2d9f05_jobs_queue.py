@@ -0,0 +1,39 @@
+"""Jobs queue
+
+Revision ID: c41a7e2d9f05
+Revises: 3b9e5a7f2c14
+Create Date: 2026-10-19 14:26:11.507392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41a7e2d9f05'
+down_revision = '3b9e5a7f2c14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jobs',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('args', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_pending_run_at', 'jobs', ['run_at'],
+        postgresql_where=sa.text("status = 'pending'"))
+
+
+def downgrade():
+    op.drop_index('ix_jobs_pending_run_at', table_name='jobs')
+    op.drop_table('jobs')
@@ -38,6 +38,9 @@ class Venue(db.Model):
     seeking_description = db.Column(db.String)
     state_id = db.Column(db.Integer, db.ForeignKey('states.id'), nullable=False)
     state = db.relationship('State', back_populates='venues', lazy=True)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geocell = db.Column(db.Integer, index=True)
     genres = db.relationship('Genre', secondary=venue_genres_table, lazy=True)
     shows = db.relationship('Show', back_populates='venue', lazy=True, cascade='all, delete-orphan')
     created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
@@ -63,8 +66,43 @@ class Artist(db.Model):
 
 class Show(db.Model):
     __tablename__ = 'shows'
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        {'postgresql_partition_by': 'RANGE (start_time)'}
+    )
     venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), primary_key=True)
     artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), primary_key=True)
     start_time = db.Column(db.DateTime(timezone=True), primary_key=True)
     venue = db.relationship('Venue', back_populates='shows', lazy=True)
-    artist = db.relationship('Artist', back_populates='shows', lazy=True)
\ No newline at end of file
+    artist = db.relationship('Artist', back_populates='shows', lazy=True)
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_pending_run_at', 'run_at', postgresql_where=db.text("status = 'pending'")),
+    )
+    id = db.Column(db.BigInteger, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    args = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+    locked_at = db.Column(db.DateTime(timezone=True))
+    locked_by = db.Column(db.String(32))
+    last_error = db.Column(db.String)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+
+class BookingRollup(db.Model):
+    __tablename__ = 'booking_rollups'
+    genre_id = db.Column(db.Integer, db.ForeignKey('genres.id'), primary_key=True)
+    state_id = db.Column(db.Integer, db.ForeignKey('states.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    show_count = db.Column(db.Integer, nullable=False, default=0)
+
+class VenueUtilization(db.Model):
+    __tablename__ = 'venue_utilization'
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    show_count = db.Column(db.Integer, nullable=False, default=0)
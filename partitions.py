@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from models import db
+from jobs import job
+
+# Monthly range partitions of the shows table are named shows_yYYYYmMM.
+# Partitions older than the retention window are detached and moved into the
+# archive schema, so they stop taking part in planning and scans of `shows`.
+ARCHIVE_SCHEMA = 'shows_archive'
+DEFAULT_PARTITION = 'shows_default'
+
+partitions_cli = AppGroup('partitions', help='Manage monthly partitions of the shows table.')
+
+
+def month_start(value):
+    return value.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+def partition_name(month):
+    return f'shows_y{month:%Y}m{month:%m}'
+
+def attached_partitions():
+    rows = db.session.execute(db.text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'shows'
+    """)).fetchall()
+    months = {}
+    for name, in rows:
+        if name == DEFAULT_PARTITION:
+            continue
+        months[datetime.strptime(name, 'shows_y%Ym%m').replace(tzinfo=timezone.utc)] = name
+    return months
+
+def create_partition(month):
+    # Rows for this month may already sit in the default partition (shows
+    # booked beyond the precreated horizon); move them before attaching,
+    # otherwise PostgreSQL refuses the new range.
+    name = partition_name(month)
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    db.session.execute(db.text(f'CREATE TABLE {name} (LIKE shows INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    db.session.execute(db.text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE start_time >= :lower AND start_time < :upper
+            RETURNING venue_id, artist_id, start_time
+        )
+        INSERT INTO {name} (venue_id, artist_id, start_time) SELECT * FROM moved
+    """), {'lower': lower, 'upper': upper})
+    db.session.execute(db.text(
+        f"ALTER TABLE shows ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+    return name
+
+def drop_foreign_keys(name):
+    # A detached partition keeps its venue_id/artist_id foreign keys, which
+    # would stop venues and artists with archived shows from being deleted.
+    # Archived rows are history: they may outlive the rows they point to.
+    constraints = db.session.execute(db.text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:name AS regclass) AND contype = 'f'"
+    ), {'name': name}).fetchall()
+    for constraint, in constraints:
+        db.session.execute(db.text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+
+def archive_partition(name):
+    db.session.execute(db.text(f'ALTER TABLE shows DETACH PARTITION {name}'))
+    drop_foreign_keys(name)
+    db.session.execute(db.text(f'ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}'))
+    tablespace = current_app.config.get('SHOWS_ARCHIVE_TABLESPACE')
+    if tablespace:
+        db.session.execute(db.text(f'ALTER TABLE {ARCHIVE_SCHEMA}.{name} SET TABLESPACE {tablespace}'))
+
+def ensure_future_partitions(months_ahead, now=None):
+    current = month_start(now or datetime.now(timezone.utc))
+    existing = attached_partitions()
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            created.append(create_partition(month))
+    db.session.commit()
+    return created
+
+def archive_old_partitions(retain_months, now=None):
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -retain_months)
+    archived = []
+    for month, name in sorted(attached_partitions().items()):
+        if month < cutoff:
+            archive_partition(name)
+            archived.append(name)
+    db.session.commit()
+    return archived
+
+@job('partitions.maintain', every=timedelta(days=1))
+def maintain():
+    created = ensure_future_partitions(current_app.config['SHOWS_PARTITIONS_AHEAD'])
+    archived = archive_old_partitions(current_app.config['SHOWS_RETENTION_MONTHS'])
+    return created, archived
+
+
+@partitions_cli.command('maintain')
+def maintain_command():
+    """Create upcoming partitions and archive the expired ones."""
+    created, archived = maintain()
+    click.echo(f'created: {", ".join(created) or "-"}')
+    click.echo(f'archived: {", ".join(archived) or "-"}')
+
+@partitions_cli.command('create')
+@click.option('--months', default=None, type=int, help='Months ahead of the current one.')
+def create_command(months):
+    """Create partitions up to MONTHS ahead of the current month."""
+    if months is None:
+        months = current_app.config['SHOWS_PARTITIONS_AHEAD']
+    for name in ensure_future_partitions(months):
+        click.echo(f'created {name}')
+
+@partitions_cli.command('archive')
+@click.option('--retain', default=None, type=int, help='Months of past shows kept attached.')
+def archive_command(retain):
+    """Detach partitions older than RETAIN months into the archive schema."""
+    if retain is None:
+        retain = current_app.config['SHOWS_RETENTION_MONTHS']
+    for name in archive_old_partitions(retain):
+        click.echo(f'archived {name}')
@@ -0,0 +1,128 @@
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from threading import Lock, Thread, get_ident
+from flask import current_app, request
+
+# Statistical profiler for live requests. A profiled request registers its
+# thread; one background thread wakes every PROFILER_INTERVAL seconds, reads
+# the current stack of each registered thread from sys._current_frames() and
+# counts it, collapsed, under the request's endpoint. Requests are profiled
+# when PROFILER_ENABLED picks them (PROFILER_SAMPLE_RATE of all requests),
+# or when an admin sends `X-Profile: 1`.
+#
+# The sampler times its own work and stretches its interval so that it
+# never uses more than PROFILER_MAX_OVERHEAD of one CPU.
+
+MAX_DEPTH = 128
+TRUNCATED = '[truncated]'
+
+_lock = Lock()
+_active = {}
+_stacks = defaultdict(Counter)
+_requests = Counter()
+_overhead = {'busy': 0.0, 'since': time.monotonic(), 'ticks': 0, 'interval': None}
+_sampler = None
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+def collapse(frame):
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+def sample(max_stacks):
+    frames = sys._current_frames()
+    with _lock:
+        for ident, (endpoint, budget) in list(_active.items()):
+            frame = frames.get(ident)
+            if frame is None or budget <= 0:
+                continue
+            _active[ident] = (endpoint, budget - 1)
+            stacks = _stacks[endpoint]
+            stack = collapse(frame)
+            if stack not in stacks and len(stacks) >= max_stacks:
+                stack = TRUNCATED
+            stacks[stack] += 1
+
+def run_sampler(interval, max_overhead, max_stacks):
+    _overhead['interval'] = interval
+    while True:
+        time.sleep(_overhead['interval'])
+        started = time.perf_counter()
+        if _active:
+            sample(max_stacks)
+        busy = time.perf_counter() - started
+        _overhead['busy'] += busy
+        _overhead['ticks'] += 1
+        _overhead['interval'] = max(interval, busy / max_overhead)
+
+def ensure_sampler(config):
+    global _sampler
+    with _lock:
+        if _sampler is None:
+            _sampler = Thread(target=run_sampler, name='profiler', daemon=True, args=(
+                config['PROFILER_INTERVAL'], config['PROFILER_MAX_OVERHEAD'], config['PROFILER_MAX_STACKS']))
+            _sampler.start()
+
+def should_profile():
+    from views.admin import is_admin
+    if request.headers.get('X-Profile') == '1' and is_admin():
+        return True
+    config = current_app.config
+    return config['PROFILER_ENABLED'] and random.random() < config['PROFILER_SAMPLE_RATE']
+
+def stats():
+    with _lock:
+        elapsed = time.monotonic() - _overhead['since']
+        return {
+            'endpoints': [{
+                'endpoint': endpoint,
+                'requests': _requests[endpoint],
+                'samples': sum(stacks.values()),
+                'stacks': len(stacks)
+            } for endpoint, stacks in sorted(_stacks.items())],
+            'sampler': {
+                'running': _sampler is not None,
+                'interval': _overhead['interval'],
+                'ticks': _overhead['ticks'],
+                'overhead': _overhead['busy'] / elapsed if elapsed > 0 else 0.0
+            }
+        }
+
+def collapsed(endpoint):
+    # One `frame;frame;frame count` line per stack, the input format of
+    # flamegraph.pl and speedscope.
+    with _lock:
+        stacks = _stacks.get(endpoint)
+        if stacks is None:
+            return None
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+def reset():
+    with _lock:
+        _stacks.clear()
+        _requests.clear()
+        _overhead.update(busy=0.0, since=time.monotonic(), ticks=0)
+
+def init_app(app):
+    @app.before_request
+    def start_profile():
+        if request.endpoint and not request.endpoint.startswith('admin.') and should_profile():
+            ensure_sampler(current_app.config)
+            with _lock:
+                _active[get_ident()] = (request.endpoint, current_app.config['PROFILER_MAX_SAMPLES'])
+                _requests[request.endpoint] += 1
+
+    @app.teardown_request
+    def stop_profile(error=None):
+        if _active:
+            with _lock:
+                _active.pop(get_ident(), None)
@@ -0,0 +1,174 @@
+import math
+import time
+from collections import Counter
+from importlib import import_module
+from threading import BoundedSemaphore, Lock
+from flask import Response, current_app, g, request
+
+# Admission control for expensive routes. Each request is mapped to a route
+# class (RATELIMIT_ROUTES by endpoint, or 'write' for any non-GET request)
+# and must then pass, in order:
+#   - a token bucket per client and route class -> 429 when empty
+#   - a per-process concurrency cap on the class, waited on for at most
+#     `queue_timeout` seconds                    -> 503 when full
+# Both answer immediately with Retry-After, without touching the database.
+# Buckets live in RATELIMIT_STORE: in-process by default, or any store
+# sharing them between workers (see SharedStore).
+
+_shed = Counter()
+_shed_lock = Lock()
+
+
+class InProcessStore:
+    # A bucket that has refilled to `burst` is the same as no bucket, so
+    # entries are dropped once full: every `sweep_interval` seconds a pass
+    # removes them, bounding memory by the clients seen in the last
+    # sweep_interval + burst / rate seconds.
+    def __init__(self, sweep_interval=60):
+        self._buckets = {}
+        self._lock = Lock()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def take(self, key, rate, burst, now):
+        # Returns 0 when a token was taken, else the seconds until one is due.
+        with self._lock:
+            if now >= self._next_sweep:
+                self.sweep(now)
+            tokens, updated, _ = self._buckets.get(key, (burst, now, None))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            taken = tokens >= 1
+            if taken:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            return 0.0 if taken else (1 - tokens) / rate
+
+    def sweep(self, now):
+        # Callers hold _lock.
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        self._next_sweep = now + self.sweep_interval
+
+
+class SharedStore:
+    # Buckets in a key-value service shared by all workers. The client needs
+    # get(key) and compare_and_set(key, expected, value, ttl); contention is
+    # resolved by retrying, and a request that keeps losing is shed.
+    def __init__(self, client, attempts=5):
+        self.client = client
+        self.attempts = attempts
+
+    def take(self, key, rate, burst, now):
+        for _ in range(self.attempts):
+            current = self.client.get(key)
+            tokens, updated = current or (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            value = (tokens - 1 if tokens >= 1 else tokens, now)
+            if self.client.compare_and_set(key, current, value, ttl=math.ceil(burst / rate)):
+                return wait
+        return 1 / rate
+
+
+class LocalClient:
+    # In-memory stand-in for the shared key-value service, for tests and
+    # single-host setups.
+    def __init__(self, sweep_interval=60):
+        self._values = {}
+        self._lock = Lock()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._values.get(key, (None, 0))
+            return value if expires > time.time() else None
+
+    def compare_and_set(self, key, expected, value, ttl):
+        with self._lock:
+            now = time.time()
+            if now >= self._next_sweep:
+                # Expired values are dropped, as the shared service would.
+                self._values = {key: entry for key, entry in self._values.items() if entry[1] > now}
+                self._next_sweep = now + self.sweep_interval
+            current, expires = self._values.get(key, (None, 0))
+            if expires <= now:
+                current = None
+            if current != expected:
+                return False
+            self._values[key] = (value, now + ttl)
+            return True
+
+
+def local_shared_store(app):
+    return SharedStore(LocalClient())
+
+def create_store(app):
+    path = app.config['RATELIMIT_STORE']
+    if not path:
+        return InProcessStore()
+    module, name = path.rsplit('.', 1)
+    return getattr(import_module(module), name)(app)
+
+def record_shed(route_class, reason):
+    with _shed_lock:
+        _shed[route_class, reason] += 1
+
+def stats():
+    with _shed_lock:
+        shed = dict(_shed)
+    return {
+        'shed': [{'route_class': route_class, 'reason': reason, 'count': count}
+                 for (route_class, reason), count in sorted(shed.items())]
+    }
+
+def route_class():
+    routes = current_app.config['RATELIMIT_ROUTES']
+    if request.endpoint in routes:
+        return routes[request.endpoint]
+    if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        return 'write'
+    return None
+
+def client_key():
+    # Behind N proxies the client is the N-th X-Forwarded-For entry from the
+    # right, the one added by the outermost trusted proxy. Entries further
+    # left come from the client itself and could be anything.
+    hops = current_app.config['RATELIMIT_PROXY_HOPS']
+    if hops:
+        forwarded = [address.strip() for address in request.headers.get('X-Forwarded-For', '').split(',')
+                     if address.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.remote_addr or '-'
+
+def shed(status, message, retry_after):
+    response = Response(message, status=status, mimetype='text/plain')
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def init_app(app):
+    store = create_store(app)
+    classes = app.config['RATELIMIT_CLASSES']
+    slots = {name: BoundedSemaphore(limits['concurrency']) for name, limits in classes.items()}
+
+    @app.before_request
+    def admit():
+        name = route_class()
+        if name not in classes:
+            return None
+        limits = classes[name]
+        wait = store.take(f'{name}:{client_key()}', limits['rate'], limits['burst'], time.time())
+        if wait > 0:
+            record_shed(name, 'rate')
+            return shed(429, 'Too Many Requests', wait)
+        if not slots[name].acquire(timeout=limits['queue_timeout']):
+            record_shed(name, 'concurrency')
+            return shed(503, 'Service Unavailable', limits['queue_timeout'])
+        g.admission_slot = slots[name]
+        return None
+
+    @app.teardown_request
+    def release(error=None):
+        slot = g.pop('admission_slot', None)
+        if slot is not None:
+            slot.release()
@@ -0,0 +1,57 @@
+from collections import namedtuple
+from itertools import groupby
+from models import db, State, Venue, Artist, Show
+
+# Read side of the listing and search pages. Only the columns a page renders
+# are selected and executed as plain Core statements, so rows never become
+# ORM objects (no identity map, no change tracking, no lazy loads) and are
+# kept as compact namedtuples. Upcoming-show counts are joined in from one
+# grouped subquery filtered on start_time, which prunes the shows table to
+# the current and future partitions.
+
+ArtistRow = namedtuple('ArtistRow', 'id name num_upcoming_shows')
+VenueRow = namedtuple('VenueRow', 'id name city state num_upcoming_shows')
+ShowRow = namedtuple('ShowRow', 'venue_id venue_name artist_id artist_name artist_image_link start_time')
+Area = namedtuple('Area', 'city state venues')
+
+
+def upcoming_counts(column, current_time):
+    return db.session.query(column.label('entity_id'), db.func.count().label('upcoming'))\
+        .filter(Show.start_time > current_time).group_by(column).subquery()
+
+def search_filter(model, search_term):
+    return db.or_(
+        model.name.ilike(f'%{search_term}%'),
+        db.func.concat(model.city, ', ', State.name).ilike(f'%{search_term}%'))
+
+def fetch(query, record):
+    return [record._make(row) for row in db.session.execute(query.statement)]
+
+def artists(current_time, search_term=None):
+    upcoming = upcoming_counts(Show.artist_id, current_time)
+    query = db.session.query(Artist.id, Artist.name, db.func.coalesce(upcoming.c.upcoming, 0))\
+        .outerjoin(upcoming, upcoming.c.entity_id == Artist.id)
+    if search_term is not None:
+        query = query.join(State, State.id == Artist.state_id).filter(search_filter(Artist, search_term))
+    return fetch(query.order_by(Artist.name.asc()), ArtistRow)
+
+def venues(current_time, search_term=None):
+    upcoming = upcoming_counts(Show.venue_id, current_time)
+    query = db.session.query(Venue.id, Venue.name, Venue.city, State.name,
+            db.func.coalesce(upcoming.c.upcoming, 0))\
+        .join(State, State.id == Venue.state_id)\
+        .outerjoin(upcoming, upcoming.c.entity_id == Venue.id)
+    if search_term is not None:
+        query = query.filter(search_filter(Venue, search_term))
+    return fetch(query.order_by(Venue.city.asc(), State.name.asc(), Venue.id.asc()), VenueRow)
+
+def venue_areas(current_time):
+    return [Area(city, state, list(rows)) for (city, state), rows in
+            groupby(venues(current_time), key=lambda venue: (venue.city, venue.state))]
+
+def shows():
+    query = db.session.query(Show.venue_id, Venue.name, Show.artist_id, Artist.name,
+            Artist.image_link, Show.start_time)\
+        .join(Venue, Venue.id == Show.venue_id)\
+        .join(Artist, Artist.id == Show.artist_id)
+    return fetch(query, ShowRow)
@@ -0,0 +1,342 @@
+import time
+from threading import RLock
+import numpy as np
+from flask import current_app
+from models import db, Artist, Venue, Show, Genre, artist_genres_table, venue_genres_table
+
+# "Artists similar to X" and "venues that fit artist Y".
+#
+# Every artist and venue is a row holding its genre set as a bitmask (genre
+# ids are the bit positions), packed into as many 64-bit words as the
+# largest genre id needs; a genre created later, past those words, makes
+# the index rebuild. Show history
+# is kept as (artist row, venue row, show count) arrays. Scores for one
+# entity against all candidates are computed in a single vectorized pass:
+#   similar artists: genre Jaccard + cosine of the venues both played
+#   venue fit:       genre Jaccard + plays at the venue by similar artists
+# weighted by RECOMMENDATIONS_GENRE_WEIGHT. Top-k lists are cached per
+# artist; edits re-score only the changed entity and drop the cached lists
+# it can enter or leave. The index is per process and rebuilt from the
+# database every RECOMMENDATIONS_TTL seconds.
+
+_POPCOUNT16 = np.array([bin(value).count('1') for value in range(1 << 16)], dtype=np.int64)
+_SHIFTS = [np.uint64(shift) for shift in (0, 16, 32, 48)]
+_LOW16 = np.uint64(0xFFFF)
+_WORD = (1 << 64) - 1
+
+_index = None
+_lock = RLock()
+
+
+def popcount(masks):
+    # Set bits per mask, summed over its words (the last axis).
+    total = np.zeros(masks.shape, dtype=np.int64)
+    for shift in _SHIFTS:
+        total += _POPCOUNT16[((masks >> shift) & _LOW16).astype(np.int64)]
+    return total.sum(axis=-1)
+
+def jaccard(mask, masks):
+    union = popcount(masks | mask)
+    return np.where(union > 0, popcount(masks & mask) / np.maximum(union, 1), 0.0)
+
+def mask_words(max_genre_id):
+    return (max_genre_id or 0) // 64 + 1
+
+def genre_mask(genre_ids, words):
+    # Returns None when a genre id does not fit in `words` words.
+    mask = np.zeros(words, dtype=np.uint64)
+    for genre_id in genre_ids:
+        word, bit = divmod(int(genre_id), 64)
+        if word >= words:
+            return None
+        mask[word] |= np.uint64(1 << bit)
+    return mask
+
+def load_masks(model, table, key):
+    # Sorted ids and their genre masks, as Python ints.
+    ids = [entity_id for entity_id, in db.session.query(model.id).order_by(model.id)]
+    masks = dict.fromkeys(ids, 0)
+    for entity_id, genre_id in db.session.query(table.c[key], table.c.genre_id):
+        if entity_id in masks:
+            masks[entity_id] |= 1 << genre_id
+    return ids, [masks[i] for i in ids]
+
+def pack_masks(ids, masks, words):
+    packed = [[mask >> (64 * word) & _WORD for word in range(words)] for mask in masks]
+    return np.array(ids, dtype=np.int64), np.array(packed, dtype=np.uint64).reshape(len(ids), words)
+
+def top_k(scores, k, exclude=None):
+    scores = scores.copy()
+    if exclude is not None:
+        scores[exclude] = -np.inf
+    k = min(k, int(np.count_nonzero(scores > 0)))
+    if k == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    rows = np.argpartition(-scores, k - 1)[:k]
+    rows = rows[np.argsort(-scores[rows], kind='stable')]
+    return rows, scores[rows]
+
+
+class Entities:
+    # Row-indexed ids and genre masks; ids are kept sorted, so lookups are a
+    # binary search. A new id is appended only when it is the largest: an
+    # older one, created by another process after this index was built,
+    # would unsort them, and the index is rebuilt instead.
+    def __init__(self, ids, masks):
+        self.ids = ids
+        self.masks = masks
+        self.active = np.ones(len(ids), dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, ids):
+        return np.searchsorted(self.ids, ids)
+
+    def row(self, entity_id):
+        row = int(np.searchsorted(self.ids, entity_id))
+        return row if row < len(self.ids) and self.ids[row] == entity_id else None
+
+    def upsert(self, entity_id, mask):
+        # Returns (row, created), or None when entity_id can't be appended.
+        row = self.row(entity_id)
+        if row is None:
+            if len(self.ids) and entity_id < self.ids[-1]:
+                return None
+            self.ids = np.append(self.ids, np.int64(entity_id))
+            self.masks = np.append(self.masks, mask[np.newaxis], axis=0)
+            self.active = np.append(self.active, True)
+            return len(self.ids) - 1, True
+        self.masks[row] = mask
+        self.active[row] = True
+        return row, False
+
+    def remove(self, entity_id):
+        row = self.row(entity_id)
+        if row is not None:
+            self.masks[row] = 0
+            self.active[row] = False
+        return row
+
+
+class RecommendationIndex:
+    def __init__(self, k, genre_weight):
+        self.k = k
+        self.genre_weight = genre_weight
+        self.built_at = time.monotonic()
+        artists = load_masks(Artist, artist_genres_table, 'artist_id')
+        venues = load_masks(Venue, venue_genres_table, 'venue_id')
+        # Read after the links, so it covers every genre they reference.
+        self.words = mask_words(db.session.query(db.func.max(Genre.id)).scalar())
+        self.artists = Entities(*pack_masks(*artists, self.words))
+        self.venues = Entities(*pack_masks(*venues, self.words))
+        plays = np.array(db.session.query(Show.artist_id, Show.venue_id, db.func.count())
+            .group_by(Show.artist_id, Show.venue_id).all(), dtype=np.int64).reshape(-1, 3)
+        self.play_artist = self.artists.rows(plays[:, 0])
+        self.play_venue = self.venues.rows(plays[:, 1])
+        self.play_count = plays[:, 2].astype(np.float64)
+        self.reset_caches()
+
+    #  Scoring
+    #  ----------------------------------------------------------------
+
+    def norms(self):
+        return np.sqrt(np.bincount(self.play_artist, weights=self.play_count ** 2,
+                                   minlength=len(self.artists)))
+
+    def cosine(self, row):
+        # Cosine between the artist's per-venue show counts and everyone else's.
+        played = np.zeros(len(self.venues))
+        mine = self.play_artist == row
+        played[self.play_venue[mine]] = self.play_count[mine]
+        dots = np.bincount(self.play_artist, weights=self.play_count * played[self.play_venue],
+                           minlength=len(self.artists))
+        norms = self.norms()
+        return dots / np.maximum(norms * norms[row], 1e-12)
+
+    def artist_scores(self, row):
+        genres = jaccard(self.artists.masks[row], self.artists.masks)
+        scores = self.genre_weight * genres + (1 - self.genre_weight) * self.cosine(row)
+        return np.where(self.artists.active, scores, -np.inf)
+
+    def venue_scores(self, row):
+        similarity = self.cosine(row)
+        similarity[row] = 0
+        signal = np.bincount(self.play_venue, weights=self.play_count * similarity[self.play_artist],
+                             minlength=len(self.venues))
+        if signal.max(initial=0) > 0:
+            signal /= signal.max()
+        genres = jaccard(self.artists.masks[row], self.venues.masks)
+        scores = self.genre_weight * genres + (1 - self.genre_weight) * signal
+        return np.where(self.venues.active, scores, -np.inf)
+
+    #  Cached top-k lists
+    #  ----------------------------------------------------------------
+
+    def reset_caches(self):
+        self.similar = {}
+        self.matches = {}
+        # Score of the k-th entry of each cached list (+inf when not cached,
+        # 0 when the list is shorter than k): a re-scored entity beating it
+        # has to enter that list.
+        self.similar_kth = np.full(len(self.artists), np.inf)
+        self.matches_kth = np.full(len(self.artists), np.inf)
+
+    def grow_caches(self):
+        missing = len(self.artists) - len(self.similar_kth)
+        if missing > 0:
+            self.similar_kth = np.append(self.similar_kth, np.full(missing, np.inf))
+            self.matches_kth = np.append(self.matches_kth, np.full(missing, np.inf))
+
+    def kth(self, scores):
+        return scores[-1] if len(scores) == self.k else 0.0
+
+    def similar_to(self, row):
+        if row not in self.similar:
+            rows, scores = top_k(self.artist_scores(row), self.k, exclude=row)
+            self.similar[row] = (rows, scores)
+            self.similar_kth[row] = self.kth(scores)
+        return self.similar[row]
+
+    def matches_for(self, row):
+        if row not in self.matches:
+            rows, scores = top_k(self.venue_scores(row), self.k)
+            self.matches[row] = (rows, scores)
+            self.matches_kth[row] = self.kth(scores)
+        return self.matches[row]
+
+    def drop(self, similar=(), matches=()):
+        for row in similar:
+            if self.similar.pop(int(row), None) is not None:
+                self.similar_kth[row] = np.inf
+        for row in matches:
+            if self.matches.pop(int(row), None) is not None:
+                self.matches_kth[row] = np.inf
+
+    def lists_containing(self, cache, member):
+        return [owner for owner, (rows, _) in cache.items() if member in rows]
+
+    #  Incremental updates
+    #  ----------------------------------------------------------------
+
+    # Each returns False when the index has to be rebuilt instead.
+
+    def artist_changed(self, artist_id, genre_ids):
+        mask = genre_mask(genre_ids, self.words)
+        upserted = None if mask is None else self.artists.upsert(artist_id, mask)
+        if upserted is None:
+            return False
+        row, _ = upserted
+        self.grow_caches()
+        scores = self.artist_scores(row)
+        scores[row] = -np.inf
+        self.drop(similar=[row] + self.lists_containing(self.similar, row)
+                  + list(np.flatnonzero(scores > self.similar_kth)), matches=[row])
+        return True
+
+    def venue_changed(self, venue_id, genre_ids):
+        mask = genre_mask(genre_ids, self.words)
+        upserted = None if mask is None else self.venues.upsert(venue_id, mask)
+        if upserted is None:
+            return False
+        row, _ = upserted
+        # The plays signal is at most 1, so this bounds the venue's new score.
+        bound = self.genre_weight * jaccard(self.venues.masks[row], self.artists.masks) \
+            + (1 - self.genre_weight)
+        self.drop(matches=self.lists_containing(self.matches, row)
+                  + list(np.flatnonzero(bound > self.matches_kth)))
+        return True
+
+    def show_added(self, artist_id, venue_id):
+        artist_row, venue_row = self.artists.row(artist_id), self.venues.row(venue_id)
+        if artist_row is None or venue_row is None:
+            self.reset_caches()
+            return
+        same = np.flatnonzero((self.play_artist == artist_row) & (self.play_venue == venue_row))
+        if len(same):
+            self.play_count[same[0]] += 1
+        else:
+            self.play_artist = np.append(self.play_artist, artist_row)
+            self.play_venue = np.append(self.play_venue, venue_row)
+            self.play_count = np.append(self.play_count, 1.0)
+        # Only artists sharing a venue with this one see their co-occurrence move.
+        related = np.flatnonzero(self.cosine(artist_row) > 0)
+        self.drop(similar=related, matches=related)
+
+    def entity_removed(self, entities, entity_id, plays):
+        row = entities.remove(entity_id)
+        if row is not None:
+            keep = plays != row
+            self.play_artist, self.play_venue, self.play_count = \
+                self.play_artist[keep], self.play_venue[keep], self.play_count[keep]
+            self.reset_caches()
+
+
+def index():
+    global _index
+    config = current_app.config
+    with _lock:
+        if _index is None or time.monotonic() - _index.built_at > config['RECOMMENDATIONS_TTL']:
+            _index = RecommendationIndex(config['RECOMMENDATIONS_K'], config['RECOMMENDATIONS_GENRE_WEIGHT'])
+        return _index
+
+def similar_artists(artist_id):
+    with _lock:
+        recommendations = index()
+        row = recommendations.artists.row(artist_id)
+        if row is None:
+            return None
+        rows, scores = recommendations.similar_to(row)
+        return list(zip(recommendations.artists.ids[rows].tolist(), scores.tolist()))
+
+def venue_matches(artist_id):
+    with _lock:
+        recommendations = index()
+        row = recommendations.artists.row(artist_id)
+        if row is None:
+            return None
+        rows, scores = recommendations.matches_for(row)
+        return list(zip(recommendations.venues.ids[rows].tolist(), scores.tolist()))
+
+#  Hooks for the create/edit/delete handlers; no-ops until the index is built.
+#  ----------------------------------------------------------------
+
+def artist_changed(artist_id, genre_ids=None):
+    global _index
+    if _index is None:
+        return
+    if genre_ids is None:
+        genre_ids = [genre_id for genre_id, in db.session.query(artist_genres_table.c.genre_id)
+                     .filter(artist_genres_table.c.artist_id == artist_id)]
+    with _lock:
+        if _index is not None and not _index.artist_changed(int(artist_id), genre_ids):
+            _index = None
+
+def venue_changed(venue_id, genre_ids=None):
+    global _index
+    if _index is None:
+        return
+    if genre_ids is None:
+        genre_ids = [genre_id for genre_id, in db.session.query(venue_genres_table.c.genre_id)
+                     .filter(venue_genres_table.c.venue_id == venue_id)]
+    with _lock:
+        if _index is not None and not _index.venue_changed(int(venue_id), genre_ids):
+            _index = None
+
+def show_added(artist_id, venue_id):
+    if _index is None:
+        return
+    with _lock:
+        _index.show_added(int(artist_id), int(venue_id))
+
+def artist_removed(artist_id):
+    if _index is None:
+        return
+    with _lock:
+        _index.entity_removed(_index.artists, artist_id, _index.play_artist)
+
+def venue_removed(venue_id):
+    if _index is None:
+        return
+    with _lock:
+        _index.entity_removed(_index.venues, venue_id, _index.play_venue)
@@ -0,0 +1,135 @@
+from datetime import date
+import click
+from flask.cli import AppGroup
+from models import db, Genre, State, BookingRollup, VenueUtilization
+
+# Bookings are pre-aggregated into two rollup tables, kept exact by the
+# handlers that create or remove shows (or change the genres/state they are
+# attributed to):
+#   booking_rollups:   shows per artist genre x venue state x month
+#   venue_utilization: shows per venue x month
+# Reports only ever read these tables, whose size does not grow with the
+# number of shows, so ops queries no longer scan `shows`.
+
+reports_cli = AppGroup('reports', help='Booking analytics rollups.')
+
+MONTH = "CAST(date_trunc('month', shows.start_time AT TIME ZONE 'UTC') AS DATE)"
+DIMENSIONS = {
+    'genre': Genre.name,
+    'state': State.name,
+    'month': BookingRollup.month,
+}
+
+
+def apply_shows(where, params, sign=1):
+    # Adds (sign=1) or removes (sign=-1) the shows matching `where` from both
+    # rollups. Call it after the shows are flushed when adding, and before
+    # they are deleted or re-attributed when removing.
+    apply_bookings(where, params, sign)
+    db.session.execute(db.text(f"""
+        INSERT INTO venue_utilization (venue_id, month, show_count)
+        SELECT shows.venue_id, {MONTH}, :sign * count(*)
+        FROM shows
+        WHERE {where}
+        GROUP BY 1, 2
+        ON CONFLICT (venue_id, month)
+        DO UPDATE SET show_count = venue_utilization.show_count + EXCLUDED.show_count
+    """), dict(params, sign=sign))
+
+def apply_bookings(where, params, sign=1):
+    # booking_rollups only: what changes when shows move to another state.
+    db.session.execute(db.text(f"""
+        INSERT INTO booking_rollups (genre_id, state_id, month, show_count)
+        SELECT artist_genres.genre_id, venues.state_id, {MONTH}, :sign * count(*)
+        FROM shows
+        JOIN venues ON venues.id = shows.venue_id
+        JOIN artist_genres ON artist_genres.artist_id = shows.artist_id
+        WHERE {where}
+        GROUP BY 1, 2, 3
+        ON CONFLICT (genre_id, state_id, month)
+        DO UPDATE SET show_count = booking_rollups.show_count + EXCLUDED.show_count
+    """), dict(params, sign=sign))
+
+def add_show(show):
+    apply_shows('shows.venue_id = :venue_id AND shows.artist_id = :artist_id AND shows.start_time = :start_time',
+                {'venue_id': show.venue_id, 'artist_id': show.artist_id, 'start_time': show.start_time})
+
+def apply_venue(venue_id, sign):
+    apply_shows('shows.venue_id = :venue_id', {'venue_id': venue_id}, sign)
+
+def apply_artist(artist_id, sign):
+    apply_shows('shows.artist_id = :artist_id', {'artist_id': artist_id}, sign)
+
+def move_venue_state(venue_id, sign):
+    # Around a state change: sign=-1 before the update, sign=1 after it.
+    apply_bookings('shows.venue_id = :venue_id', {'venue_id': venue_id}, sign)
+
+def move_artist_genres(artist_id, removed, added):
+    # Takes the artist's shows out of the unlinked genres and into the linked
+    # ones, in one statement that does not depend on the link rows.
+    if not removed and not added:
+        return
+    db.session.execute(db.text(f"""
+        INSERT INTO booking_rollups (genre_id, state_id, month, show_count)
+        SELECT changed.genre_id, venues.state_id, {MONTH}, changed.sign * count(*)
+        FROM shows
+        JOIN venues ON venues.id = shows.venue_id
+        CROSS JOIN unnest(CAST(:genre_ids AS INTEGER[]), CAST(:signs AS INTEGER[])) AS changed (genre_id, sign)
+        WHERE shows.artist_id = :artist_id
+        GROUP BY 1, 2, 3, changed.sign
+        ON CONFLICT (genre_id, state_id, month)
+        DO UPDATE SET show_count = booking_rollups.show_count + EXCLUDED.show_count
+    """), {'artist_id': artist_id, 'genre_ids': list(removed) + list(added),
+           'signs': [-1] * len(removed) + [1] * len(added)})
+
+def backfill(since=None):
+    # Rebuilds the rollups from the shows table. Shows in archived partitions
+    # are no longer visible there, so pass `since` to keep older months.
+    where, params = 'TRUE', {}
+    if since is not None:
+        where, params = 'shows.start_time >= :since', {'since': since}
+        BookingRollup.query.filter(BookingRollup.month >= since).delete(synchronize_session=False)
+        VenueUtilization.query.filter(VenueUtilization.month >= since).delete(synchronize_session=False)
+    else:
+        db.session.execute(db.text('TRUNCATE booking_rollups, venue_utilization'))
+    apply_shows(where, params)
+    db.session.commit()
+
+def bookings(group_by, genre_ids=(), state_ids=(), since=None, until=None):
+    columns = [DIMENSIONS[name] for name in group_by]
+    query = db.session.query(*columns, db.func.sum(BookingRollup.show_count))\
+        .join(Genre, Genre.id == BookingRollup.genre_id)\
+        .join(State, State.id == BookingRollup.state_id)
+    if genre_ids:
+        query = query.filter(BookingRollup.genre_id.in_(genre_ids))
+    if state_ids:
+        query = query.filter(BookingRollup.state_id.in_(state_ids))
+    if since is not None:
+        query = query.filter(BookingRollup.month >= since)
+    if until is not None:
+        query = query.filter(BookingRollup.month <= until)
+    rows = query.group_by(*columns).order_by(*columns).all()
+    return [dict(zip(group_by, row[:-1]), show_count=int(row[-1])) for row in rows]
+
+def venue_utilization(venue_id, since=None, until=None):
+    query = db.session.query(VenueUtilization.month, VenueUtilization.show_count)\
+        .filter(VenueUtilization.venue_id == venue_id)
+    if since is not None:
+        query = query.filter(VenueUtilization.month >= since)
+    if until is not None:
+        query = query.filter(VenueUtilization.month <= until)
+    return [{'month': month, 'show_count': count} for month, count in query.order_by(VenueUtilization.month)]
+
+def parse_month(value):
+    if not value:
+        return None
+    year, month = value.split('-')[:2]
+    return date(int(year), int(month), 1)
+
+
+@reports_cli.command('backfill')
+@click.option('--since', default=None, help='First month (YYYY-MM) to rebuild; all months by default.')
+def backfill_command(since):
+    """Rebuild the booking rollups from the shows table."""
+    backfill(parse_month(since))
+    click.echo('rollups rebuilt' + (f' since {since}' if since else ''))
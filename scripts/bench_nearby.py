@@ -0,0 +1,108 @@
+"""Nearby-venues benchmark: grid cell lookup against a brute-force scan.
+
+Generates synthetic venues across the continental US in memory, sorts them
+by geocell the way the `venues.geocell` index does, and times radius
+queries both ways, reading one index range per grid row. Runs each
+--radius (the defaults go up to GEO_MAX_RADIUS_KM), then the nearest-k
+search, which grows its radius up to that maximum, over venues clustered
+around a few cities with queries from anywhere, so most searches start in
+a sparse area. Run from the repository root:
+
+    $ python scripts/bench_nearby.py --venues 1000000 --queries 200
+"""
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo import cell_for, cell_ranges, haversine_km
+
+SOUTH, NORTH, WEST, EAST = 25.0, 49.0, -124.0, -67.0
+NEAREST_START_KM = 10
+MAX_RADIUS_KM = 500
+
+
+class Grid:
+    def __init__(self, venues):
+        entries = sorted((cell_for(lat, lng), venue_id) for venue_id, (lat, lng) in enumerate(venues))
+        self.cells = [cell for cell, _ in entries]
+        self.ids = [venue_id for _, venue_id in entries]
+        self.scanned = 0
+
+    def candidates(self, lat, lng, radius):
+        found = []
+        for first, last in cell_ranges(lat, lng, radius):
+            found.extend(self.ids[bisect.bisect_left(self.cells, first):bisect.bisect_right(self.cells, last)])
+        self.scanned += len(found)
+        return found
+
+
+def within(venues, lat, lng, radius, candidates):
+    return sorted(venue_id for venue_id in candidates if haversine_km(lat, lng, *venues[venue_id]) <= radius)
+
+def nearest(venues, lat, lng, k, candidates_for):
+    radius = NEAREST_START_KM
+    while True:
+        found = sorted((haversine_km(lat, lng, *venues[venue_id]), venue_id)
+                       for venue_id in candidates_for(radius))
+        found = [venue_id for distance, venue_id in found if distance <= radius]
+        if len(found) >= k or radius >= MAX_RADIUS_KM:
+            return found[:k]
+        radius = min(radius * 2, MAX_RADIUS_KM)
+
+def compare(label, venues, points, brute_query, grid_query, grid):
+    started = time.perf_counter()
+    brute = [brute_query(lat, lng) for lat, lng in points]
+    brute_time = time.perf_counter() - started
+    grid.scanned = 0
+    started = time.perf_counter()
+    found = [grid_query(lat, lng) for lat, lng in points]
+    grid_time = time.perf_counter() - started
+    assert brute == found, f'{label}: grid lookup disagrees with brute-force scan'
+    print(f'{label:22} brute {brute_time / len(points) * 1000:9.2f} ms  '
+          f'grid {grid_time / len(points) * 1000:9.2f} ms  '
+          f'{grid.scanned / len(points):9.0f} candidates  {brute_time / grid_time:7.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--venues', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--radius', type=float, nargs='+', default=[30.0, 230.0, 500.0])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--cities', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    points = [(rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)) for _ in range(args.queries)]
+    venues = [(rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)) for _ in range(args.venues)]
+    grid = Grid(venues)
+    print(f'{args.venues} venues, {args.queries} queries; per query:')
+    for radius in args.radius:
+        compare(f'uniform, {radius:g} km', venues, points,
+                lambda lat, lng: within(venues, lat, lng, radius, range(len(venues))),
+                lambda lat, lng: within(venues, lat, lng, radius, grid.candidates(lat, lng, radius)),
+                grid)
+
+    cities = [(rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)) for _ in range(args.cities)]
+    venues = []
+    for _ in range(args.venues):
+        lat, lng = rng.choice(cities)
+        venues.append((lat + rng.gauss(0, 0.1), lng + rng.gauss(0, 0.1)))
+    grid = Grid(venues)
+    compare(f'clustered, nearest {args.k}', venues, points,
+            lambda lat, lng: [venue_id for distance, venue_id in sorted(
+                (haversine_km(lat, lng, *venue), venue_id) for venue_id, venue in enumerate(venues))
+                if distance <= MAX_RADIUS_KM][:args.k],
+            lambda lat, lng: nearest(venues, lat, lng, args.k,
+                                     lambda radius: grid.candidates(lat, lng, radius)),
+            grid)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Shows partitioning benchmark: listing queries on a plain and a partitioned table.
+
+Generates N synthetic shows spread over past and future months into a
+scratch schema of the configured database, laid out three ways: one plain
+table, the same rows partitioned by month, and the partitioned table after
+the months past the retention window were detached. Times the upcoming
+show counts of /artists and /venues and the past/upcoming queries of
+/venues/<id> against each. Run from the repository root:
+
+    $ python scripts/bench_partitions.py --shows 10000000 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db
+from partitions import add_months, month_start, partition_name
+
+SCHEMA = 'bench_partitions'
+INDEXES = """
+    CREATE INDEX ON {table} (venue_id, start_time);
+    CREATE INDEX ON {table} (artist_id, start_time);
+"""
+QUERIES = {
+    'upcoming counts': 'SELECT artist_id, count(*) FROM {table} WHERE start_time > :now GROUP BY artist_id',
+    'show_venue past': 'SELECT * FROM {table} WHERE venue_id = :venue_id AND start_time <= :now',
+    'show_venue upcoming': 'SELECT * FROM {table} WHERE venue_id = :venue_id AND start_time > :now',
+}
+
+
+def execute(sql, **params):
+    return db.session.execute(db.text(sql), params)
+
+def fill(table, args, first, last):
+    # Unique start times, so rows never collide on the primary key.
+    execute(f"""
+        INSERT INTO {table} (venue_id, artist_id, start_time)
+        SELECT i * 7919 % :venues + 1, i * 104729 % :artists + 1,
+               :first + (:last - :first) * (i::float8 / :shows)
+        FROM generate_series(0::bigint, :shows - 1) AS i
+    """, venues=args.venues, artists=args.artists, shows=args.shows, first=first, last=last)
+
+def create_tables(args, now):
+    first = add_months(month_start(now), -args.past_months)
+    last = add_months(month_start(now), args.future_months)
+    execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+    execute(f'CREATE SCHEMA {SCHEMA}')
+    columns = '(venue_id INTEGER NOT NULL, artist_id INTEGER NOT NULL, ' \
+              'start_time TIMESTAMP WITH TIME ZONE NOT NULL, PRIMARY KEY (venue_id, artist_id, start_time))'
+
+    execute(f'CREATE TABLE {SCHEMA}.plain {columns}')
+    execute(INDEXES.format(table=f'{SCHEMA}.plain'))
+    fill(f'{SCHEMA}.plain', args, first, last)
+
+    execute(f'CREATE TABLE {SCHEMA}.partitioned {columns} PARTITION BY RANGE (start_time)')
+    month = first
+    while month < last:
+        execute(f"CREATE TABLE {SCHEMA}.{partition_name(month)} PARTITION OF {SCHEMA}.partitioned "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')")
+        month = add_months(month, 1)
+    execute(f'CREATE TABLE {SCHEMA}.partitioned_default PARTITION OF {SCHEMA}.partitioned DEFAULT')
+    execute(INDEXES.format(table=f'{SCHEMA}.partitioned'))
+    fill(f'{SCHEMA}.partitioned', args, first, last)
+    execute(f'ANALYZE {SCHEMA}.plain')
+    execute(f'ANALYZE {SCHEMA}.partitioned')
+    db.session.commit()
+    return first
+
+def detach_expired(first, now, retain_months):
+    cutoff = add_months(month_start(now), -retain_months)
+    month = first
+    while month < cutoff:
+        execute(f'ALTER TABLE {SCHEMA}.partitioned DETACH PARTITION {SCHEMA}.{partition_name(month)}')
+        month = add_months(month, 1)
+    db.session.commit()
+
+def measure(table, sql, now, venue_ids):
+    timings = []
+    for venue_id in venue_ids:
+        started = time.perf_counter()
+        execute(sql.format(table=table), now=now, venue_id=venue_id).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def report(layout, table, now, venue_ids):
+    for name, sql in QUERIES.items():
+        print(f'{layout:24} {name:20} {measure(table, sql, now, venue_ids):10.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shows', type=int, default=10000000)
+    parser.add_argument('--venues', type=int, default=20000)
+    parser.add_argument('--artists', type=int, default=50000)
+    parser.add_argument('--past-months', type=int, default=48)
+    parser.add_argument('--future-months', type=int, default=6)
+    parser.add_argument('--retain', type=int, default=24, help='Months kept attached, as SHOWS_RETENTION_MONTHS.')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--keep', action='store_true', help=f'Keep the {SCHEMA} schema afterwards.')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        now = datetime.now(timezone.utc)
+        rng = random.Random(args.seed)
+        venue_ids = [rng.randint(1, args.venues) for _ in range(args.repeat)]
+        started = time.perf_counter()
+        first = create_tables(args, now)
+        print(f'{args.shows} shows over {args.past_months + args.future_months} months '
+              f'loaded in {time.perf_counter() - started:.0f} s; median ms over {args.repeat} runs\n')
+        print(f'{"layout":24} {"query":20} {"ms":>10}')
+        report('plain', f'{SCHEMA}.plain', now, venue_ids)
+        report('partitioned', f'{SCHEMA}.partitioned', now, venue_ids)
+        detach_expired(first, now, args.retain)
+        report(f'partitioned, {args.retain}m kept', f'{SCHEMA}.partitioned', now, venue_ids)
+        if not args.keep:
+            execute(f'DROP SCHEMA {SCHEMA} CASCADE')
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Listing microbenchmark: ORM hydration against the column-only read models.
+
+Builds the /artists, /venues and /shows view data both ways against the
+configured database and reports CPU time and allocated bytes per row.
+Run from the repository root on a database with representative data:
+
+    $ python scripts/bench_readmodels.py --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, Venue, Artist, Show
+import readmodels
+
+
+def orm_artists(current_time):
+    upcoming = dict(db.session.query(Show.artist_id, db.func.count())
+        .filter(Show.start_time > current_time).group_by(Show.artist_id))
+    return [{
+        'id': artist.id,
+        'name': artist.name,
+        'num_upcoming_shows': upcoming.get(artist.id, 0)
+    } for artist in Artist.query.order_by(Artist.name.asc()).all()]
+
+def orm_venues(current_time):
+    upcoming = dict(db.session.query(Show.venue_id, db.func.count())
+        .filter(Show.start_time > current_time).group_by(Show.venue_id))
+    return [{
+        'id': venue.id,
+        'name': venue.name,
+        'city': venue.city,
+        'state': venue.state.name,
+        'num_upcoming_shows': upcoming.get(venue.id, 0)
+    } for venue in Venue.query.order_by(Venue.city.asc()).all()]
+
+def orm_shows(current_time):
+    return [{
+        'venue_id': show.venue.id,
+        'venue_name': show.venue.name,
+        'artist_id': show.artist_id,
+        'artist_name': show.artist.name,
+        'artist_image_link': show.artist.image_link,
+        'start_time': str(show.start_time)
+    } for show in Show.query.all()]
+
+CASES = [
+    ('artists', orm_artists, readmodels.artists),
+    ('venues', orm_venues, readmodels.venues),
+    ('shows', orm_shows, lambda current_time: readmodels.shows()),
+]
+
+
+def measure(build, current_time, repeat):
+    rows = len(build(current_time))
+    db.session.remove()
+    started = time.process_time()
+    for _ in range(repeat):
+        build(current_time)
+        db.session.remove()
+    cpu = (time.process_time() - started) / repeat
+    tracemalloc.start()
+    build(current_time)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.remove()
+    return rows, cpu, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        current_time = datetime.now().astimezone()
+        print(f'{"page":8} {"path":10} {"rows":>8} {"cpu us/row":>11} {"peak B/row":>11}')
+        for name, orm, read_model in CASES:
+            for path, build in (('orm', orm), ('readmodel', read_model)):
+                rows, cpu, peak = measure(build, current_time, args.repeat)
+                per_row = max(rows, 1)
+                print(f'{name:8} {path:10} {rows:8d} {cpu / per_row * 1e6:11.2f} {peak / per_row:11.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Worker boot benchmark: time to import the app and build it with create_app().
+
+Each run is a fresh interpreter started with `python -X importtime`, the
+same cost a new gunicorn worker pays. Prints the median boot time, the
+slowest imports, and exits non-zero when the median exceeds the target.
+Run from the repository root:
+
+    $ python scripts/bench_startup.py --runs 10 --target-ms 250
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOOT = 'import time; t = time.perf_counter(); import app; app.create_app(); ' \
+       'print((time.perf_counter() - t) * 1000)'
+# Worker boot budget, in milliseconds, for the autoscaler's scale-up path.
+TARGET_MS = 250
+
+
+def boot_once(cli):
+    env = dict(os.environ)
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    if cli:
+        env['FLASK_RUN_FROM_CLI'] = 'true'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', BOOT],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    imports = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports[name.strip()] = int(cumulative)
+    return float(result.stdout.strip().splitlines()[-1]), imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--target-ms', type=float, default=TARGET_MS)
+    parser.add_argument('--cli', action='store_true', help='Boot as the flask CLI would.')
+    args = parser.parse_args()
+
+    timings = []
+    imports = defaultdict(list)
+    for _ in range(args.runs):
+        elapsed, cumulative = boot_once(args.cli)
+        timings.append(elapsed)
+        for name, micros in cumulative.items():
+            imports[name].append(micros)
+
+    median = statistics.median(timings)
+    print(f'boot: median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms '
+          f'over {args.runs} runs (target {args.target_ms:.0f} ms)')
+    print('\nslowest imports (median cumulative):')
+    slowest = sorted(((statistics.median(v), k) for k, v in imports.items()), reverse=True)
+    for micros, name in slowest[:args.top]:
+        print(f'{micros / 1000:9.1f} ms  {name}')
+    if median > args.target_ms:
+        sys.exit(f'\nboot median {median:.1f} ms is over the {args.target_ms:.0f} ms target')
+
+
+if __name__ == '__main__':
+    main()
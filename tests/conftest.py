@@ -0,0 +1,42 @@
+import os
+from types import SimpleNamespace
+import pytest
+import config
+
+# Tests marked with the `database` fixture run against a disposable
+# PostgreSQL database, migrated to head and emptied before each test:
+#
+#     $ FYYUR_TEST_DATABASE_URL=postgresql://localhost/fyyur_test python -m pytest
+DATABASE_URL = os.environ.get('FYYUR_TEST_DATABASE_URL')
+TABLES = ['shows', 'venue_genres', 'artist_genres', 'venues', 'artists', 'jobs',
+          'booking_rollups', 'venue_utilization']
+
+
+def settings(**overrides):
+    values = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+@pytest.fixture(scope='session')
+def app():
+    if not DATABASE_URL:
+        pytest.skip('FYYUR_TEST_DATABASE_URL is not set')
+    from flask_migrate import Migrate, upgrade
+    from app import create_app
+    from models import db
+    app = create_app(settings(SQLALCHEMY_DATABASE_URI=DATABASE_URL, TESTING=True, CLI=False,
+                              RATELIMIT_ENABLED=False, WTF_CSRF_ENABLED=False))
+    Migrate(app, db, directory=os.path.join(config.basedir, 'migrations'))
+    with app.app_context():
+        upgrade()
+    return app
+
+@pytest.fixture
+def database(app):
+    from models import db
+    with app.app_context():
+        db.session.execute(db.text(f'TRUNCATE {", ".join(TABLES)} RESTART IDENTITY CASCADE'))
+        db.session.commit()
+        db.session.remove()
+    return app
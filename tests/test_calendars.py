@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+from flask import Flask
+import pytest
+import calendars
+from models import db, Show
+import writes
+
+CALIFORNIA = 5
+
+
+@pytest.fixture
+def feeds(monkeypatch):
+    monkeypatch.setattr(calendars, '_feeds', calendars.OrderedDict())
+    monkeypatch.setattr(calendars, '_cached_chars', 0)
+    return calendars._feeds
+
+def add_venue_with_shows(app, count):
+    values = {column: '' for column in writes.VENUE_COLUMNS}
+    values.update(name='The Dueling Pianos Bar', seeking_talent=False, state_id=CALIFORNIA)
+    artist = {column: '' for column in writes.ARTIST_COLUMNS}
+    artist.update(name='The Wild Sax Band', seeking_venue=False, available_from=None, available_to=None,
+                  state_id=CALIFORNIA)
+    start = datetime.now(timezone.utc).replace(microsecond=0)
+    with app.app_context():
+        venue_id = writes.create('venue', values, [])
+        artist_id = writes.create('artist', artist, [])
+        db.session.execute(Show.__table__.insert().values([
+            {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start + timedelta(days=day)}
+            for day in range(count)]))
+        db.session.commit()
+    return venue_id
+
+
+def test_cache_is_bounded_by_total_size(feeds):
+    app = Flask(__name__)
+    app.config.update(FEEDS_CACHE_SIZE=10, FEEDS_CACHE_CHARS=250)
+    with app.app_context():
+        for key in range(3):
+            calendars.store_feed(('venue', key), 'x' * 100)
+        assert list(feeds) == [('venue', 1), ('venue', 2)]
+        calendars.store_feed(('venue', 2), 'x' * 10)
+        calendars.invalidate([('venue', 1)])
+    assert calendars._cached_chars == 10
+
+def test_small_feed_is_cached_with_its_etag(database, feeds):
+    venue_id = add_venue_with_shows(database, 3)
+    client = database.test_client()
+    response = client.get(f'/venues/{venue_id}/shows.ics')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).count('BEGIN:VEVENT') == 3
+    assert client.get(f'/venues/{venue_id}/shows.ics',
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert ('venue', venue_id) in feeds
+
+def test_large_feed_is_streamed_and_not_cached(database, feeds, monkeypatch):
+    monkeypatch.setitem(database.config, 'FEEDS_STREAM_THRESHOLD', 1000)
+    monkeypatch.setitem(database.config, 'FEEDS_BATCH_SIZE', 16)
+    venue_id = add_venue_with_shows(database, 50)
+    response = database.test_client().get(f'/venues/{venue_id}/shows.ics')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'ETag' not in response.headers
+    body = response.get_data(as_text=True)
+    assert body.count('BEGIN:VEVENT') == 50 and body.endswith('END:VCALENDAR\r\n')
+    assert not feeds
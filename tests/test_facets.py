@@ -0,0 +1,63 @@
+from flask import Flask
+import facets
+from facets import FacetIndex, bitmap_of, members
+
+GENRES = {1: 'Jazz', 2: 'Rock', 3: 'Pop'}
+STATES = {10: 'CA', 11: 'NY'}
+
+
+def make_index():
+    return FacetIndex({
+        1: ({1, 2}, 10, True),
+        2: ({2}, 11, False),
+        5: ({3}, 10, False),
+    }, GENRES, STATES, 'Seeking venue')
+
+def filters(genre=(), state=(), seeking=()):
+    return {'genre': list(genre), 'state': list(state), 'seeking': list(seeking)}
+
+
+def test_members_decodes_set_bits():
+    assert members(0) == set()
+    assert members(1 << 0 | 1 << 9 | 1 << 4000) == {0, 9, 4000}
+
+def test_bitmap_of_sets_each_id():
+    assert bitmap_of([]) == 0
+    assert bitmap_of([9, 0, 4000]) == 1 << 0 | 1 << 9 | 1 << 4000
+
+def test_select_ors_within_and_ands_across_facets():
+    index = make_index()
+    assert members(index.select(filters(genre=[1, 3]))) == {1, 5}
+    assert members(index.select(filters(genre=[2], state=[10]))) == {1}
+    assert members(index.select(filters(seeking=[False]))) == {2, 5}
+
+def test_counts_ignore_the_facets_own_selection():
+    counts = make_index().counts(filters(genre=[2], state=[10]))
+    assert counts['genre'] == {1: 1, 2: 1, 3: 1}
+    assert counts['state'] == {10: 1, 11: 1}
+    assert counts['seeking'] == {True: 1, False: 0}
+
+def test_add_replaces_and_remove_clears():
+    index = make_index()
+    index.add(2, [3], 10, True)
+    index.remove(1)
+    assert members(index.select(filters(genre=[2]))) == set()
+    assert members(index.select(filters(genre=[3], seeking=[True]))) == {2}
+    assert members(index.all) == {2, 5}
+
+def test_changes_during_a_rebuild_are_replayed_onto_it(monkeypatch):
+    app = Flask(__name__)
+    app.config['FACETS_TTL'] = 300
+
+    def build(kind):
+        # A write committed after the rebuild read the tables.
+        facets.artist_changed(7, [3], 11, True)
+        return make_index()
+
+    monkeypatch.setattr(facets, '_indexes', {})
+    monkeypatch.setattr(facets, 'build', build)
+    with app.app_context():
+        index = facets.index('artist')
+    assert facets._indexes['artist'] is index
+    assert members(index.select(filters(genre=[3]))) == {5, 7}
+    assert facets._rebuilding == {}
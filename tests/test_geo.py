@@ -0,0 +1,31 @@
+import random
+from geo import CELL_COLUMNS, bounding_box, cell_col, cell_for, cell_ranges, cell_row
+
+
+def box_cells(latitude, longitude, radius_km):
+    south, north, west, east = bounding_box(latitude, longitude, radius_km)
+    columns = min(int((east - west) // 0.25) + 2, CELL_COLUMNS)
+    first = 0 if columns == CELL_COLUMNS else cell_col(west)
+    return {row * CELL_COLUMNS + (first + offset) % CELL_COLUMNS
+            for row in range(cell_row(south), cell_row(north) + 1) for offset in range(columns)}
+
+
+def test_ranges_cover_exactly_the_bounding_box_cells():
+    rng = random.Random(7)
+    for _ in range(200):
+        latitude, longitude = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        radius = rng.choice([0, 30, 230, 500, 2000])
+        ranges = cell_ranges(latitude, longitude, radius)
+        assert all(last < first for (_, last), (first, _) in zip(ranges, ranges[1:]))
+        assert {cell for first, last in ranges for cell in range(first, last + 1)} \
+            == box_cells(latitude, longitude, radius)
+
+def test_large_circle_is_one_range_per_row():
+    ranges = cell_ranges(40.0, -100.0, 500)
+    assert len(ranges) == 36
+    assert any(first <= cell_for(44.0, -96.0) <= last for first, last in ranges)
+
+def test_ranges_wrap_the_antimeridian():
+    ranges = cell_ranges(0.0, 179.9, 30)
+    assert any(first <= cell_for(0.0, -179.9) <= last for first, last in ranges)
+    assert any(first <= cell_for(0.0, 179.9) <= last for first, last in ranges)
@@ -0,0 +1,138 @@
+import pytest
+from flask import Flask
+import ratelimit
+from ratelimit import InProcessStore, LocalClient, SharedStore
+
+
+def in_process_store():
+    return InProcessStore()
+
+def shared_store():
+    return SharedStore(LocalClient())
+
+STORES = [in_process_store, shared_store]
+
+
+class RacingClient(LocalClient):
+    # Lets a rival worker take a token between our read and our write.
+    def __init__(self, races):
+        super().__init__()
+        self.races = races
+        self.rival = SharedStore(self)
+
+    def compare_and_set(self, key, expected, value, ttl):
+        if self.races:
+            self.races -= 1
+            assert self.rival.take(key, 2.0, 2, 100.0) == 0.0
+        return super().compare_and_set(key, expected, value, ttl)
+
+
+class LosingClient(LocalClient):
+    def compare_and_set(self, key, expected, value, ttl):
+        return False
+
+
+@pytest.mark.parametrize('make_store', STORES)
+def test_burst_then_wait_until_next_token(make_store):
+    store = make_store()
+    assert [store.take('search:a', 2.0, 3, 100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take('search:a', 2.0, 3, 100.0) == pytest.approx(0.5)
+
+@pytest.mark.parametrize('make_store', STORES)
+def test_refills_at_rate(make_store):
+    store = make_store()
+    store.take('search:a', 2.0, 1, 100.0)
+    assert store.take('search:a', 2.0, 1, 100.25) == pytest.approx(0.25)
+    assert store.take('search:a', 2.0, 1, 100.5) == 0.0
+
+@pytest.mark.parametrize('make_store', STORES)
+def test_refill_is_capped_at_burst(make_store):
+    store = make_store()
+    store.take('search:a', 2.0, 2, 100.0)
+    taken = [store.take('search:a', 2.0, 2, 1000.0) for _ in range(3)]
+    assert taken[:2] == [0.0, 0.0]
+    assert taken[2] == pytest.approx(0.5)
+
+@pytest.mark.parametrize('make_store', STORES)
+def test_buckets_are_per_key(make_store):
+    store = make_store()
+    assert store.take('search:a', 1.0, 1, 100.0) == 0.0
+    assert store.take('search:a', 1.0, 1, 100.0) > 0
+    assert store.take('search:b', 1.0, 1, 100.0) == 0.0
+    assert store.take('write:a', 1.0, 1, 100.0) == 0.0
+
+def test_in_process_store_drops_refilled_buckets():
+    store = InProcessStore(sweep_interval=60)
+    for address in range(1000):
+        store.take(f'search:{address}', 2.0, 4, 100.0)
+    store.take('search:busy', 2.0, 4, 159.9)
+    # The first buckets refilled at 100.5 s; the sweep due at 160 s drops them.
+    store.take('search:new', 2.0, 4, 160.0)
+    assert set(store._buckets) == {'search:busy', 'search:new'}
+    assert store.take('search:0', 2.0, 4, 160.0) == 0.0
+
+def test_local_client_drops_expired_values(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'time', lambda: clock[0])
+    client = LocalClient(sweep_interval=60)
+    for address in range(100):
+        assert client.compare_and_set(f'search:{address}', None, (1, 1000.0), ttl=2)
+    clock[0] = 1061.0
+    assert client.compare_and_set('search:new', None, (1, 1061.0), ttl=2)
+    assert list(client._values) == ['search:new']
+
+def test_shared_store_retries_after_losing_a_race():
+    store = SharedStore(RacingClient(races=1))
+    assert store.take('search:a', 2.0, 2, 100.0) == 0.0
+    # Both the rival's token and ours were taken.
+    assert store.take('search:a', 2.0, 2, 100.0) == pytest.approx(0.5)
+
+def test_shared_store_sheds_when_every_attempt_loses():
+    store = SharedStore(LosingClient(), attempts=3)
+    assert store.take('search:a', 4.0, 10, 100.0) == pytest.approx(0.25)
+
+def test_retry_after_rounds_up_to_whole_seconds():
+    assert ratelimit.shed(429, 'Too Many Requests', 0.25).headers['Retry-After'] == '1'
+    assert ratelimit.shed(429, 'Too Many Requests', 2.1).headers['Retry-After'] == '3'
+
+
+def create_app(**config):
+    app = Flask(__name__)
+    app.config.update(RATELIMIT_STORE=None, RATELIMIT_PROXY_HOPS=0,
+                      RATELIMIT_ROUTES={'search': 'search'},
+                      RATELIMIT_CLASSES={'search': {'rate': 0.5, 'burst': 2, 'concurrency': 1,
+                                                    'queue_timeout': 0.1}})
+    app.config.update(config)
+
+    @app.route('/search')
+    def search():
+        return 'ok'
+
+    ratelimit.init_app(app)
+    return app
+
+@pytest.mark.parametrize('hops, expected', [
+    (0, '10.0.0.1'),
+    (1, '203.0.113.7'),
+    (2, 'spoofed'),
+    (3, '10.0.0.1'),
+])
+def test_client_key_trusts_only_proxy_added_entries(hops, expected):
+    app = create_app(RATELIMIT_PROXY_HOPS=hops)
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.1'},
+                                  headers={'X-Forwarded-For': 'spoofed, 203.0.113.7'}):
+        assert ratelimit.client_key() == expected
+
+def test_rotating_forwarded_for_does_not_reset_the_bucket():
+    client = create_app(RATELIMIT_PROXY_HOPS=1).test_client()
+    statuses = [client.get('/search', headers={'X-Forwarded-For': f'198.51.100.{n}, 203.0.113.7'}).status_code
+                for n in range(3)]
+    assert statuses == [200, 200, 429]
+
+def test_shed_response_carries_retry_after():
+    client = create_app().test_client()
+    client.get('/search')
+    client.get('/search')
+    response = client.get('/search')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from models import db, Genre, artist_genres_table
+import recommendations
+from recommendations import Entities, genre_mask, jaccard, mask_words, pack_masks, popcount
+import writes
+
+CALIFORNIA = 5
+WIDE_GENRES = [64, 130]
+
+
+def test_masks_span_as_many_words_as_the_largest_genre_needs():
+    assert mask_words(None) == 1
+    assert mask_words(63) == 1
+    assert mask_words(64) == 2
+    mask = genre_mask([1, 64, 130], 3)
+    assert mask.tolist() == [2, 1, 4]
+    assert genre_mask([192], 3) is None
+
+def test_scores_count_bits_across_words():
+    ids, masks = pack_masks([1, 2], [1 << 1 | 1 << 70, 1 << 70 | 1 << 130], 3)
+    assert popcount(masks).tolist() == [2, 2]
+    assert jaccard(masks[0], masks).tolist() == [1.0, pytest.approx(1 / 3)]
+
+def test_upsert_appends_a_row_of_words():
+    entities = Entities(*pack_masks([1], [1 << 3], 2))
+    assert entities.upsert(2, genre_mask([65], 2)) == (1, True)
+    assert entities.masks.shape == (2, 2)
+    assert entities.masks[1].tolist() == [0, 2]
+
+
+@pytest.fixture
+def wide_genres(database):
+    with database.app_context():
+        db.session.execute(Genre.__table__.insert().values(
+            [{'id': genre_id, 'name': f'Genre {genre_id}'} for genre_id in WIDE_GENRES]))
+        db.session.commit()
+    recommendations._index = None
+    yield database
+    recommendations._index = None
+    with database.app_context():
+        db.session.execute(artist_genres_table.delete().where(artist_genres_table.c.genre_id.in_(WIDE_GENRES)))
+        db.session.execute(Genre.__table__.delete().where(Genre.id.in_(WIDE_GENRES)))
+        db.session.commit()
+
+def test_genre_ids_past_63_are_scored(wide_genres):
+    values = {column: '' for column in writes.ARTIST_COLUMNS}
+    values.update(seeking_venue=False, available_from=None, available_to=None, state_id=CALIFORNIA)
+    with wide_genres.app_context():
+        first = writes.create('artist', dict(values, name='First'), [1, 130])
+        second = writes.create('artist', dict(values, name='Second'), [130])
+        db.session.commit()
+    client = wide_genres.test_client()
+    response = client.get(f'/artists/{first}/similar.json')
+    assert response.status_code == 200
+    assert [entry['id'] for entry in response.get_json()['data']] == [second]
+    assert client.get(f'/artists/{first}/venue-matches.json').status_code == 200
+    # A genre past the index's words makes it rebuild instead of failing.
+    with wide_genres.app_context():
+        recommendations.artist_changed(second, [1, 200])
+    assert recommendations._index is None
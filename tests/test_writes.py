@@ -0,0 +1,162 @@
+import re
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import event
+from models import db, Venue, Artist, Show, BookingRollup, VenueUtilization, venue_genres_table, artist_genres_table
+import reports
+import writes
+
+FORMS = {
+    'venue': {'name': 'The Musical Hop', 'city': 'San Francisco', 'address': '1015 Folsom Street',
+              'phone': '123-123-1234', 'image_link': '', 'website': 'https://www.themusicalhop.com',
+              'facebook_link': '', 'seeking_talent': 'y', 'seeking_description': 'Local acts'},
+    'artist': {'name': 'Guns N Petals', 'city': 'San Francisco', 'phone': '326-123-5000',
+               'image_link': '', 'website': '', 'facebook_link': 'https://www.facebook.com/GunsNPetals',
+               'seeking_venue': 'y', 'seeking_description': '', 'available_from': '18:00',
+               'available_to': '23:30'},
+}
+MODELS = {'venue': Venue, 'artist': Artist}
+TABLES = {'venue': (venue_genres_table, 'venue_id'), 'artist': (artist_genres_table, 'artist_id')}
+CALIFORNIA = 5
+NEW_YORK = 27
+FEW = [1]
+MANY = list(range(1, 11))
+
+
+def form(kind, genre_ids, **fields):
+    return dict(FORMS[kind], state=str(CALIFORNIA), genres=[str(genre_id) for genre_id in genre_ids], **fields)
+
+def statements_of(app, send):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = send()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return response, statements
+
+def latest_id(app, kind):
+    with app.app_context():
+        return db.session.query(db.func.max(MODELS[kind].id)).scalar()
+
+def stored_genres(app, kind, entity_id):
+    table, key = TABLES[kind]
+    with app.app_context():
+        return sorted(genre_id for genre_id, in
+                      db.session.query(table.c.genre_id).filter(table.c[key] == entity_id))
+
+def create(app, kind, genre_ids):
+    response = app.test_client().post(f'/{kind}s/create', data=form(kind, genre_ids))
+    assert response.status_code == 302
+    return latest_id(app, kind)
+
+
+def test_genre_changes_links_and_unlinks_only_the_difference():
+    assert writes.genre_changes([1, 2, 3], [4, 3, 2]) == ([1], [4])
+    assert writes.genre_changes([], [3, 1]) == ([], [1, 3])
+    assert writes.genre_changes([2, 1], [1, 2]) == ([], [])
+    assert writes.genre_changes([1, 2], []) == ([1, 2], [])
+
+@pytest.mark.parametrize('kind', ['venue', 'artist'])
+def test_create_issues_the_same_statements_for_any_number_of_genres(database, kind):
+    client = database.test_client()
+    counts = []
+    for genre_ids in (FEW, MANY):
+        response, statements = statements_of(database,
+            lambda: client.post(f'/{kind}s/create', data=form(kind, genre_ids)))
+        assert response.status_code == 302
+        assert stored_genres(database, kind, latest_id(database, kind)) == genre_ids
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+@pytest.mark.parametrize('kind', ['venue', 'artist'])
+def test_edit_issues_the_same_statements_for_any_number_of_genres(database, kind):
+    client = database.test_client()
+    counts = []
+    for before, after in ((FEW, [2]), (MANY, list(range(11, 21)))):
+        entity_id = create(database, kind, before)
+        response, statements = statements_of(database,
+            lambda: client.post(f'/{kind}s/{entity_id}/edit', data=form(kind, after, name='Renamed')))
+        assert response.status_code == 302
+        assert stored_genres(database, kind, entity_id) == after
+        with database.app_context():
+            assert MODELS[kind].query.get(entity_id).name == 'Renamed'
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+@pytest.mark.parametrize('kind', ['venue', 'artist'])
+def test_edit_keeps_unchanged_genre_links(database, kind):
+    entity_id = create(database, kind, [1, 2, 3])
+    response, statements = statements_of(database, lambda: database.test_client()
+        .post(f'/{kind}s/{entity_id}/edit', data=form(kind, [2, 3, 4])))
+    assert response.status_code == 302
+    table = TABLES[kind][0].name
+    assert sum(statement.startswith(f'DELETE FROM {table}') for statement in statements) == 1
+    assert sum(statement.startswith(f'INSERT INTO {table}') for statement in statements) == 1
+    assert stored_genres(database, kind, entity_id) == [2, 3, 4]
+
+def test_invalid_submission_writes_nothing(database):
+    response = database.test_client().post('/venues/create', data=form('venue', [], name=''))
+    assert response.status_code == 200
+    assert latest_id(database, 'venue') is None
+
+def test_forms_require_their_csrf_token(database, monkeypatch):
+    monkeypatch.setitem(database.config, 'WTF_CSRF_ENABLED', True)
+    client = database.test_client()
+    assert client.post('/artists/create', data=form('artist', FEW)).status_code == 200
+    assert latest_id(database, 'artist') is None
+
+    page = client.get('/artists/create').get_data(as_text=True)
+    token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', page).group(1)
+    response = client.post('/artists/create', data=form('artist', FEW, csrf_token=token))
+    assert response.status_code == 302
+    assert latest_id(database, 'artist') is not None
+
+def rollups(app):
+    with app.app_context():
+        bookings = {(row.genre_id, row.state_id, row.month): row.show_count
+                    for row in BookingRollup.query if row.show_count}
+        utilization = {(row.venue_id, row.month): row.show_count
+                       for row in VenueUtilization.query if row.show_count}
+        return bookings, utilization
+
+def add_shows(app, venue_id, artist_id, months):
+    start = datetime(2026, 1, 1, 20, tzinfo=timezone.utc)
+    with app.app_context():
+        for month in range(months):
+            show = Show(venue_id=venue_id, artist_id=artist_id, start_time=start + timedelta(days=31 * month))
+            db.session.add(show)
+            db.session.flush()
+            reports.add_show(show)
+        db.session.commit()
+
+def rollup_statements(statements):
+    return [statement for statement in statements
+            if 'booking_rollups' in statement or 'venue_utilization' in statement]
+
+@pytest.mark.parametrize('kind, fields', [('venue', {'state': str(NEW_YORK)}), ('artist', {'genres': ['2', '3']})])
+def test_edit_moves_shows_to_the_new_attribution(database, kind, fields):
+    venue_id, artist_id = create(database, 'venue', FEW), create(database, 'artist', [1, 2])
+    add_shows(database, venue_id, artist_id, 3)
+    entity_id = venue_id if kind == 'venue' else artist_id
+    response = database.test_client().post(f'/{kind}s/{entity_id}/edit', data=dict(form(kind, FEW), **fields))
+    assert response.status_code == 302
+    edited = rollups(database)
+    with database.app_context():
+        reports.backfill()
+    assert edited == rollups(database)
+    assert {state_id for _, state_id, _ in edited[0]} == {NEW_YORK if kind == 'venue' else CALIFORNIA}
+
+@pytest.mark.parametrize('kind', ['venue', 'artist'])
+def test_edit_keeping_the_attribution_leaves_rollups_alone(database, kind):
+    venue_id, artist_id = create(database, 'venue', FEW), create(database, 'artist', FEW)
+    add_shows(database, venue_id, artist_id, 3)
+    entity_id = venue_id if kind == 'venue' else artist_id
+    response, statements = statements_of(database, lambda: database.test_client()
+        .post(f'/{kind}s/{entity_id}/edit', data=form(kind, FEW, phone='555-555-5555')))
+    assert response.status_code == 302
+    assert rollup_statements(statements) == []
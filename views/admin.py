@@ -0,0 +1,45 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import hmac
+from flask import Blueprint, Response, current_app, request, abort, jsonify
+
+blueprint = Blueprint('admin', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+def is_admin():
+  token = current_app.config['ADMIN_TOKEN']
+  return bool(token) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+@blueprint.before_request
+def require_admin():
+  if not is_admin():
+    abort(404)
+
+@blueprint.route('/admin/metrics')
+def metrics():
+  import ratelimit
+  return jsonify({'ratelimit': ratelimit.stats()})
+
+@blueprint.route('/admin/profile')
+def profile():
+  import profiler
+  return jsonify(profiler.stats())
+
+@blueprint.route('/admin/profile/<endpoint>')
+def profile_stacks(endpoint):
+  import profiler
+  stacks = profiler.collapsed(endpoint)
+  if stacks is None:
+    abort(404)
+  return Response(stacks, mimetype='text/plain')
+
+@blueprint.route('/admin/profile/reset', methods=['POST'])
+def profile_reset():
+  import profiler
+  profiler.reset()
+  return jsonify({'success': True})
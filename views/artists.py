@@ -0,0 +1,226 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import sys
+from datetime import datetime
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort, jsonify
+from models import db, Genre, State, Venue, Artist, Show
+from forms import ArtistForm
+import calendars
+import facets
+import readmodels
+import reports
+import writes
+
+blueprint = Blueprint('artists', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@blueprint.route('/artists')
+def artists():
+  current_time = datetime.now().astimezone()
+  filters = facets.parse_filters(request.args)
+  selection = facets.selection('artist', filters)
+  view_model = [artist for artist in readmodels.artists(current_time)
+                if selection is None or artist.id in selection]
+  return render_template('pages/artists.html', artists=view_model,
+    facets=facets.options('artist', filters, '.artists'))
+
+@blueprint.route('/artists/search', methods=['POST'])
+def search_artists():
+  current_time = datetime.now().astimezone()
+  search_term = request.form.get('search_term', '')
+  artists = readmodels.artists(current_time, search_term)
+  view_model = {
+    "count": len(artists),
+    "data": artists
+  }
+  return render_template('pages/search_artists.html', results=view_model, search_term=search_term)
+
+@blueprint.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+  current_time = datetime.now().astimezone()
+  artist = Artist.query.get(artist_id)
+  past_shows = db.session.query(Show)\
+    .filter(Show.artist_id == artist_id, Show.start_time <= current_time).all()
+  upcoming_shows = db.session.query(Show)\
+    .filter(Show.artist_id == artist_id, Show.start_time > current_time).all()
+  view_model = {
+    "id": artist.id,
+    "name": artist.name,
+    "genres": [genre.name for genre in artist.genres],
+    "city": artist.city,
+    "state": artist.state.name,
+    "phone": artist.phone,
+    "website": artist.website,
+    "facebook_link": artist.facebook_link,
+    "seeking_venue": artist.seeking_venue,
+    "seeking_description": artist.seeking_description,
+    'available_from': artist.available_from and artist.available_from.strftime('%I:%M %p') or '',
+    'available_to': artist.available_to and artist.available_to.strftime('%I:%M %p') or '',
+    "image_link": artist.image_link,
+    "past_shows": [{
+        "venue_id": show.venue_id,
+        "venue_name": show.venue.name,
+        "venue_image_link": show.venue.image_link,
+        "start_time": str(show.start_time)
+      } for show in past_shows],
+    "past_shows_count": len(past_shows),
+    "upcoming_shows": [{
+        "venue_id": show.venue_id,
+        "venue_name": show.venue.name,
+        "venue_image_link": show.venue.image_link,
+        "start_time": str(show.start_time)
+      } for show in upcoming_shows],
+    "upcoming_shows_count": len(upcoming_shows)
+  }
+  return render_template('pages/show_artist.html', artist=view_model)
+
+@blueprint.route('/artists/<int:artist_id>/shows.ics')
+def artist_calendar(artist_id):
+  return calendars.feed_response('artist', artist_id) or abort(404)
+
+@blueprint.route('/artists/<int:artist_id>/similar.json')
+def similar_artists(artist_id):
+  import recommendations
+  scored = recommendations.similar_artists(artist_id)
+  if scored is None:
+    abort(404)
+  names = dict(db.session.query(Artist.id, Artist.name).filter(Artist.id.in_([id for id, _ in scored])))
+  return jsonify({'artist_id': artist_id, 'data': [{
+    'id': id,
+    'name': names.get(id),
+    'score': round(score, 4)
+  } for id, score in scored]})
+
+@blueprint.route('/artists/<int:artist_id>/venue-matches.json')
+def venue_matches(artist_id):
+  import recommendations
+  scored = recommendations.venue_matches(artist_id)
+  if scored is None:
+    abort(404)
+  names = dict(db.session.query(Venue.id, Venue.name).filter(Venue.id.in_([id for id, _ in scored])))
+  return jsonify({'artist_id': artist_id, 'data': [{
+    'id': id,
+    'name': names.get(id),
+    'score': round(score, 4)
+  } for id, score in scored]})
+
+#  Update
+#  ----------------------------------------------------------------
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  form = ArtistForm()
+  form.state.query = State.query.all()
+  form.genres.query = Genre.query.all()
+  artist = Artist.query.get(artist_id)
+  form.state.data = artist.state
+  form.genres.data = artist.genres
+  view_model = {
+    'id': artist.id,
+    'name': artist.name,
+    'genres': [genre.name for genre in artist.genres],
+    'city': artist.city,
+    'state': artist.state.name,
+    'phone': artist.phone,
+    'image_link': artist.image_link,
+    'website': artist.website,
+    'facebook_link': artist.facebook_link,
+    'seeking_venue': artist.seeking_venue,
+    'seeking_description': artist.seeking_description or '',
+    'available_from': artist.available_from and artist.available_from.strftime('%H:%M') or '',
+    'available_to': artist.available_to and artist.available_to.strftime('%H:%M') or ''
+  }
+  return render_template('forms/edit_artist.html', form=form, artist=view_model)
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  form = writes.bind(ArtistForm)
+  if not form.validate():
+    flash('The artist could not be edited: ' + writes.errors(form))
+    return redirect(url_for('.edit_artist', artist_id=artist_id))
+  try:
+    values, genre_ids = writes.form_values('artist', form)
+    feed_keys = calendars.related_feed_keys('artist', artist_id)
+    changes = writes.update('artist', artist_id, values, genre_ids)
+    if changes is None:
+      raise LookupError(f'artist {artist_id} does not exist')
+    # Shows are attributed to the artist's genres: move them between the
+    # unlinked and linked ones.
+    reports.move_artist_genres(artist_id, *changes)
+    db.session.commit()
+    calendars.invalidate(feed_keys)
+    import recommendations
+    recommendations.artist_changed(artist_id, genre_ids)
+    facets.artist_changed(artist_id, genre_ids, values['state_id'], values['seeking_venue'])
+    flash('Artist ' + values['name'] + ' was successfully edited!')
+  except:
+    db.session.rollback()
+    print(sys.exc_info())
+    flash('An error occurred. The artist could not be edited.')
+    return redirect(url_for('.edit_artist', artist_id=artist_id))
+  finally:
+    db.session.close()
+  return redirect(url_for('.show_artist', artist_id=artist_id))
+
+@blueprint.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+  try:
+    artist = Artist.query.get(artist_id)
+    feed_keys = calendars.related_feed_keys('artist', artist.id)
+    reports.apply_artist(artist.id, -1)
+    db.session.delete(artist)
+    db.session.commit()
+    calendars.invalidate(feed_keys)
+    import recommendations
+    recommendations.artist_removed(artist_id)
+    facets.artist_removed(artist_id)
+    flash('Artist ' + artist.name + ' was successfully deleted!')
+  except:
+    db.session.rollback()
+    print(sys.exc_info())
+    flash('An error occurred. The artist could not be deleted.')
+    return '{ "success": "false" }'
+  finally:
+    db.session.close()
+  return '{ "success": "true" }'
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@blueprint.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  form = ArtistForm()
+  form.state.query = State.query.order_by(State.name.asc())
+  form.genres.query = Genre.query.order_by(Genre.name.asc())
+  return render_template('forms/new_artist.html', form=form)
+
+@blueprint.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  form = writes.bind(ArtistForm)
+  if not form.validate():
+    flash('Artist ' + form.name.data + ' could not be listed: ' + writes.errors(form))
+    return render_template('forms/new_artist.html', form=form)
+  try:
+    values, genre_ids = writes.form_values('artist', form)
+    artist_id = writes.create('artist', values, genre_ids)
+    db.session.commit()
+    import recommendations
+    recommendations.artist_changed(artist_id, genre_ids)
+    facets.artist_changed(artist_id, genre_ids, values['state_id'], values['seeking_venue'])
+    flash('Artist ' + values['name'] + ' was successfully listed!')
+  except:
+    db.session.rollback()
+    print(sys.exc_info())
+    flash('An error occurred. Artist ' + form.name.data + ' could not be listed.')
+    return redirect(url_for('.create_artist_form'))
+  finally:
+    db.session.close()
+  return redirect(url_for('main.index'))
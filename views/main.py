@@ -0,0 +1,22 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, render_template
+from models import Venue, Artist
+
+blueprint = Blueprint('main', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+@blueprint.route('/')
+def index():
+  artists = Artist.query.order_by(Artist.created_at.desc()).limit(10).all()
+  venues = Venue.query.order_by(Venue.created_at.desc()).limit(3).all()
+  view_model = {
+    'recent_artists': artists,
+    'recent_venues': venues
+  }
+  return render_template('pages/home.html', view_model=view_model)
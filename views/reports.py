@@ -0,0 +1,63 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, render_template, request, abort, jsonify
+from models import Genre, State
+import reports
+
+blueprint = Blueprint('reports', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+def report_filters():
+  group_by = [name for name in request.args.get('group_by', 'genre,state').split(',') if name]
+  if not group_by or any(name not in reports.DIMENSIONS for name in group_by):
+    abort(400)
+  try:
+    since = reports.parse_month(request.args.get('from'))
+    until = reports.parse_month(request.args.get('to'))
+  except ValueError:
+    abort(400)
+  return {
+    'group_by': group_by,
+    'genre_ids': request.args.getlist('genre', type=int),
+    'state_ids': request.args.getlist('state', type=int),
+    'since': since,
+    'until': until
+  }
+
+@blueprint.route('/reports')
+def bookings_report():
+  filters = report_filters()
+  view_model = {
+    'filters': filters,
+    'rows': reports.bookings(**filters),
+    'genres': Genre.query.order_by(Genre.name.asc()).all(),
+    'states': State.query.order_by(State.name.asc()).all(),
+    'dimensions': list(reports.DIMENSIONS)
+  }
+  return render_template('pages/reports.html', report=view_model)
+
+@blueprint.route('/reports/bookings.json')
+def bookings_report_json():
+  rows = reports.bookings(**report_filters())
+  for row in rows:
+    if 'month' in row:
+      row['month'] = row['month'].strftime('%Y-%m')
+  return jsonify({'count': len(rows), 'data': rows})
+
+@blueprint.route('/reports/venues/<int:venue_id>.json')
+def venue_utilization_json(venue_id):
+  try:
+    since = reports.parse_month(request.args.get('from'))
+    until = reports.parse_month(request.args.get('to'))
+  except ValueError:
+    abort(400)
+  rows = reports.venue_utilization(venue_id, since, until)
+  return jsonify({'venue_id': venue_id, 'data': [{
+    'month': row['month'].strftime('%Y-%m'),
+    'show_count': row['show_count']
+  } for row in rows]})
@@ -0,0 +1,67 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import sys
+from datetime import datetime
+from flask import Blueprint, render_template, request, flash, redirect, url_for, abort
+from models import db, Artist, Show
+from forms import ShowForm
+import calendars
+import readmodels
+import reports
+
+blueprint = Blueprint('shows', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@blueprint.route('/shows')
+def shows():
+  view_model = readmodels.shows()
+  return render_template('pages/shows.html', shows=view_model)
+
+@blueprint.route('/states/<int:state_id>/shows.ics')
+def state_calendar(state_id):
+  return calendars.feed_response('state', state_id) or abort(404)
+
+@blueprint.route('/shows/create')
+def create_shows():
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@blueprint.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  try:
+    data = request.form
+    show = Show()
+    show.venue_id = data['venue_id']
+    show.artist_id = data['artist_id']
+    show.start_time = datetime.strptime(data['start_time'], '%Y-%m-%d %H:%M:%S')
+    artist = Artist.query.get(show.artist_id)
+    is_free = not artist.available_from and not artist.available_to
+    if is_free or artist.available_from.time() <= show.start_time.time() <= artist.available_to.time():
+      feed_keys = calendars.show_feed_keys(show.venue_id, show.artist_id)
+      db.session.add(show)
+      db.session.flush()
+      reports.add_show(show)
+      db.session.commit()
+      calendars.invalidate(feed_keys)
+      import recommendations
+      recommendations.show_added(data['artist_id'], data['venue_id'])
+      flash('Show was successfully listed!')
+    else:
+      flash('Show could not be listed. Artist is not available for this schedule!')
+      return redirect(url_for('.create_shows'))
+  except:
+    db.session.rollback()
+    print(sys.exc_info())
+    flash('An error occurred. Show could not be listed.')
+    return redirect(url_for('.create_shows'))
+  finally:
+    db.session.close()
+  return redirect(url_for('main.index'))
@@ -0,0 +1,229 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import sys
+from datetime import datetime
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort, jsonify
+from models import db, Genre, State, Venue, Show
+from forms import VenueForm
+import calendars
+import facets
+import geo
+import jobs
+import readmodels
+import reports
+import writes
+
+blueprint = Blueprint('venues', __name__)
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues')
+def venues():
+  current_time = datetime.now().astimezone()
+  filters = facets.parse_filters(request.args)
+  selection = facets.selection('venue', filters)
+  view_model = readmodels.venue_areas(current_time)
+  if selection is not None:
+    view_model = [area._replace(venues=[venue for venue in area.venues if venue.id in selection])
+                  for area in view_model]
+    view_model = [area for area in view_model if area.venues]
+  return render_template('pages/venues.html', areas=view_model,
+    facets=facets.options('venue', filters, '.venues'))
+
+@blueprint.route('/venues/search', methods=['POST'])
+def search_venues():
+  current_time = datetime.now().astimezone()
+  search_term = request.form.get('search_term', '')
+  venues = readmodels.venues(current_time, search_term)
+  view_model = {
+    'count': len(venues),
+    'data': venues
+  }
+  return render_template('pages/search_venues.html', results=view_model, search_term=search_term)
+
+@blueprint.route('/venues/nearby')
+def nearby_venues():
+  latitude = request.args.get('lat', type=float)
+  longitude = request.args.get('lng', type=float)
+  radius = request.args.get('radius', type=float)
+  limit = request.args.get('k', type=int)
+  # Range checks also reject nan and inf.
+  if latitude is None or longitude is None or not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+    abort(400)
+  if (radius is not None and not 0 <= radius < float('inf')) or (limit is not None and limit < 1):
+    abort(400)
+  max_results = current_app.config['GEO_MAX_RESULTS']
+  if limit is None:
+    limit = max_results if radius is not None else current_app.config['GEO_NEAREST_DEFAULT_K']
+  limit = min(limit, max_results)
+  seeking_talent = request.args.get('seeking_talent')
+  venues = geo.nearby_venues(latitude, longitude,
+    radius_km=radius,
+    limit=limit,
+    genre_id=request.args.get('genre', type=int),
+    seeking_talent=None if seeking_talent is None else seeking_talent == 'y')
+  return jsonify({'count': len(venues), 'data': venues})
+
+@blueprint.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+  current_time = datetime.now().astimezone()
+  venue = Venue.query.get(venue_id)
+  past_shows = db.session.query(Show)\
+    .filter(Show.venue_id == venue_id, Show.start_time <= current_time).all()
+  upcoming_shows = db.session.query(Show)\
+    .filter(Show.venue_id == venue_id, Show.start_time > current_time).all()
+  view_model = {
+    'id': venue.id,
+    'name': venue.name,
+    'genres': [genre.name for genre in venue.genres],
+    'address': venue.address,
+    'city': venue.city,
+    'state': venue.state.name,
+    'phone': venue.phone,
+    'website': venue.website,
+    'facebook_link': venue.facebook_link,
+    'seeking_talent': venue.seeking_talent,
+    'seeking_description': venue.seeking_description,
+    'image_link': venue.image_link,
+    'past_shows': [{
+      'artist_id': show.artist_id,
+      'artist_name': show.artist.name,
+      'artist_image_link': show.artist.image_link,
+      'start_time': str(show.start_time),
+    } for show in past_shows],
+    'past_shows_count': len(past_shows),
+    'upcoming_shows': [{
+      'artist_id': show.artist_id,
+      'artist_name': show.artist.name,
+      'artist_image_link': show.artist.image_link,
+      'start_time': str(show.start_time),
+    } for show in upcoming_shows],
+    'upcoming_shows_count': len(upcoming_shows)
+  }
+  return render_template('pages/show_venue.html', venue=view_model)
+
+@blueprint.route('/venues/<int:venue_id>/shows.ics')
+def venue_calendar(venue_id):
+  return calendars.feed_response('venue', venue_id) or abort(404)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  form = VenueForm()
+  form.state.query = State.query.order_by(State.name.asc())
+  form.genres.query = Genre.query.order_by(Genre.name.asc())
+  return render_template('forms/new_venue.html', form=form)
+
+@blueprint.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  form = writes.bind(VenueForm)
+  if not form.validate():
+    flash('Venue ' + form.name.data + ' could not be listed: ' + writes.errors(form))
+    return render_template('forms/new_venue.html', form=form)
+  try:
+    values, genre_ids = writes.form_values('venue', form)
+    venue_id = writes.create('venue', values, genre_ids)
+    jobs.enqueue('geo.geocode_venue', venue_id=venue_id)
+    db.session.commit()
+    import recommendations
+    recommendations.venue_changed(venue_id, genre_ids)
+    facets.venue_changed(venue_id, genre_ids, values['state_id'], values['seeking_talent'])
+    flash('Venue ' + values['name'] + ' was successfully listed!')
+  except:
+    db.session.rollback()
+    print(sys.exc_info())
+    flash('An error occurred. Venue ' + form.name.data + ' could not be listed.')
+  finally:
+    db.session.close()
+  return redirect(url_for('main.index'))
+
+@blueprint.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  try:
+    venue = Venue.query.get(venue_id)
+    feed_keys = calendars.related_feed_keys('venue', venue.id)
+    reports.apply_venue(venue.id, -1)
+    db.session.delete(venue)
+    db.session.commit()
+    calendars.invalidate(feed_keys)
+    import recommendations
+    recommendations.venue_removed(int(venue_id))
+    facets.venue_removed(venue_id)
+    flash('Venue ' + venue.name + ' was successfully deleted!')
+  except:
+    db.session.rollback()
+    print(sys.exc_info())
+    flash('An error occurred. The venue could not be deleted.')
+    return '{ "success": "false" }'
+  finally:
+    db.session.close()
+  return '{ "success": "true" }'
+
+#  Update
+#  ----------------------------------------------------------------
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  form = VenueForm()
+  form.state.query = State.query.order_by(State.name.asc())
+  form.genres.query = Genre.query.order_by(Genre.name.asc())
+  venue = Venue.query.get(venue_id)
+  form.state.data = venue.state
+  form.genres.data = venue.genres
+  view_model = {
+    'id': venue.id,
+    'name': venue.name,
+    'genres': [genre.name for genre in venue.genres],
+    'address': venue.address,
+    'city': venue.city,
+    'state': venue.state.name,
+    'phone': venue.phone,
+    'image_link': venue.image_link,
+    'website': venue.website,
+    'facebook_link': venue.facebook_link,
+    'seeking_talent': venue.seeking_talent,
+    'seeking_description': venue.seeking_description or ''
+  }
+  return render_template('forms/edit_venue.html', form=form, venue=view_model)
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  form = writes.bind(VenueForm)
+  if not form.validate():
+    flash('The venue could not be edited: ' + writes.errors(form))
+    return redirect(url_for('.edit_venue', venue_id=venue_id))
+  try:
+    values, genre_ids = writes.form_values('venue', form)
+    feed_keys = calendars.related_feed_keys('venue', venue_id) | {('state', values['state_id'])}
+    # Shows are attributed to the venue's state: move them if it changes.
+    moved = db.session.query(Venue.state_id).filter(Venue.id == venue_id).scalar() != values['state_id']
+    if moved:
+      reports.move_venue_state(venue_id, -1)
+    if writes.update('venue', venue_id, values, genre_ids) is None:
+      raise LookupError(f'venue {venue_id} does not exist')
+    if moved:
+      reports.move_venue_state(venue_id, 1)
+    jobs.enqueue('geo.geocode_venue', venue_id=venue_id)
+    db.session.commit()
+    calendars.invalidate(feed_keys)
+    import recommendations
+    recommendations.venue_changed(venue_id, genre_ids)
+    facets.venue_changed(venue_id, genre_ids, values['state_id'], values['seeking_talent'])
+    flash('Venue ' + values['name'] + ' was successfully edited!')
+  except:
+    db.session.rollback()
+    print(sys.exc_info())
+    flash('An error occurred. The venue could not be edited.')
+    return redirect(url_for('.edit_venue', venue_id=venue_id))
+  finally:
+    db.session.close()
+  return redirect(url_for('.show_venue', venue_id=venue_id))
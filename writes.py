@@ -0,0 +1,69 @@
+from models import db, Genre, State, Venue, Artist, artist_genres_table, venue_genres_table
+
+# Write side of the artist and venue forms. A submission is validated by its
+# WTForms class, whose state and genre choices are each loaded by a single
+# query, and is then written with Core statements: one INSERT or
+# UPDATE ... RETURNING for the row, and for the genres only the difference
+# against the stored association rows. A write therefore costs the same
+# handful of statements however many genres are picked, and no ORM objects
+# are loaded or flushed.
+
+VENUE_COLUMNS = ('name', 'city', 'address', 'phone', 'image_link', 'website', 'facebook_link',
+                 'seeking_talent', 'seeking_description')
+ARTIST_COLUMNS = ('name', 'city', 'phone', 'image_link', 'website', 'facebook_link',
+                  'seeking_venue', 'seeking_description', 'available_from', 'available_to')
+
+ENTITIES = {
+    'venue': (Venue.__table__, VENUE_COLUMNS, venue_genres_table, 'venue_id'),
+    'artist': (Artist.__table__, ARTIST_COLUMNS, artist_genres_table, 'artist_id'),
+}
+
+
+def bind(form_class):
+    form = form_class()
+    form.state.query = State.query.order_by(State.name.asc())
+    form.genres.query = Genre.query.order_by(Genre.name.asc())
+    return form
+
+def form_values(kind, form):
+    columns = ENTITIES[kind][1]
+    values = {column: getattr(form, column).data for column in columns}
+    values['state_id'] = form.state.data.id
+    return values, sorted({genre.id for genre in form.genres.data})
+
+def errors(form):
+    return ', '.join(f'{name} ({"; ".join(messages)})' for name, messages in sorted(form.errors.items()))
+
+def genre_changes(current, wanted):
+    # (genre ids to unlink, genre ids to link)
+    current, wanted = set(current), set(wanted)
+    return sorted(current - wanted), sorted(wanted - current)
+
+def set_genres(kind, entity_id, genre_ids, created=False):
+    _, _, table, key = ENTITIES[kind]
+    current = ()
+    if not created:
+        current = [genre_id for (genre_id,) in
+                   db.session.execute(db.select([table.c.genre_id]).where(table.c[key] == entity_id))]
+    removed, added = genre_changes(current, genre_ids)
+    if removed:
+        db.session.execute(table.delete().where(db.and_(table.c[key] == entity_id, table.c.genre_id.in_(removed))))
+    if added:
+        db.session.execute(table.insert().values([{key: entity_id, 'genre_id': genre_id} for genre_id in added]))
+    return removed, added
+
+def create(kind, values, genre_ids):
+    table = ENTITIES[kind][0]
+    entity_id = db.session.execute(table.insert().values(**values).returning(table.c.id)).scalar()
+    set_genres(kind, entity_id, genre_ids, created=True)
+    return entity_id
+
+def update(kind, entity_id, values, genre_ids):
+    # Returns the (unlinked, linked) genre ids, or None, writing nothing,
+    # when the row does not exist.
+    table = ENTITIES[kind][0]
+    updated = db.session.execute(table.update().where(table.c.id == entity_id)
+        .values(**values).returning(table.c.id)).scalar()
+    if updated is None:
+        return None
+    return set_genres(kind, entity_id, genre_ids)